@@ -0,0 +1,187 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Structural diffs of DynamicObject trees
+#
+#####################################################
+from bubbles.dobject import DynamicObject
+from bubbles.xsd.schema import SchemaObject
+from bubbles.util.ordered_dict import OrderedDict
+from collections import namedtuple
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+Change = namedtuple('Change', 'op path old new')
+
+def _join(path, name):
+    if path:
+        return '%s.%s' % (path, name)
+    return name
+
+def _fields(old, new):
+    '''
+    Get the field names of two objects of the same class, in template
+    order for SchemaObjects, followed by any others (e.g. from xs:any).
+    '''
+    if isinstance(old, SchemaObject):
+        names = [t[0] for t in old.__template__]
+    else:
+        names = []
+    seen = set(names)
+    for obj in (old, new):
+        for name in obj.__keylist__:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    return names
+
+def _keyfield(keys, name, items):
+    '''
+    Find the key field for matching the items of a list, either by the
+    name of the list field or by the class name of its items.
+    '''
+    ret = keys.get(name)
+    if ret is None and items and isinstance(items[0], DynamicObject):
+        ret = keys.get(items[0].__class__.__name__)
+    return ret
+
+def _bykey(items, key, path):
+    ret = OrderedDict()
+    for item in items:
+        k = getattr(item, key, None)
+        if k in ret:
+            raise ValueError('Duplicate key in list', path, key, k)
+        ret[k] = item
+    return ret
+
+def diff(old, new, keys=None):
+    '''
+    Compare two trees of DynamicObjects (or SchemaObjects) and return
+    the list of changes between them.
+
+    Each change is a L{Change} of (op, path, old, new), where op is
+    'added', 'removed' or 'modified' and path names the field, like
+    'reading[id=3].value' or 'tag[1]'.  A subtree that was added or
+    removed is reported once, at its root.  Every other subtree is
+    compared field by field, except that one that is the same object in
+    both trees is skipped.
+
+    @param old: The previous tree
+    @param new: The current tree
+    @type keys: dict
+    @param keys: Optional.  Maps a list field name, or the class name of
+        its items, to the field that identifies an item.  Lists with a
+        key are matched by key instead of by position.  Raises
+        ValueError if two items of such a list have the same key.
+    @rtype: list of L{Change}
+    '''
+    if keys is None:
+        keys = {}
+    changes = []
+    stack = [('', '', old, new)]
+    while stack:
+        (path, name, old, new) = stack.pop()
+        if old is new:
+            continue
+        if isinstance(old, DynamicObject) and isinstance(new, DynamicObject):
+            if old.__class__ is not new.__class__:
+                changes.append(Change(MODIFIED, path, old, new))
+                continue
+            children = []
+            for field in _fields(old, new):
+                fpath = _join(path, field)
+                inold = field in old
+                innew = field in new
+                if not (inold or innew):
+                    continue
+                elif not innew:
+                    changes.append(Change(REMOVED, fpath, old[field], None))
+                elif not inold:
+                    changes.append(Change(ADDED, fpath, None, new[field]))
+                else:
+                    children.append((fpath, field, old[field], new[field]))
+            # Push in reverse so changes come out in field order
+            stack.extend(reversed(children))
+        elif isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+            children = []
+            key = _keyfield(keys, name, old or new)
+            if key:
+                old = _bykey(old, key, path)
+                new = _bykey(new, key, path)
+                for (k, v) in old.items():
+                    ipath = '%s[%s=%s]' % (path, key, k)
+                    if k in new:
+                        children.append((ipath, name, v, new[k]))
+                    else:
+                        changes.append(Change(REMOVED, ipath, v, None))
+                for (k, v) in new.items():
+                    if k not in old:
+                        changes.append(Change(ADDED, '%s[%s=%s]' % (path, key, k), None, v))
+            else:
+                for i in xrange(max(len(old), len(new))):
+                    ipath = '%s[%d]' % (path, i)
+                    if i >= len(new):
+                        changes.append(Change(REMOVED, ipath, old[i], None))
+                    elif i >= len(old):
+                        changes.append(Change(ADDED, ipath, None, new[i]))
+                    else:
+                        children.append((ipath, name, old[i], new[i]))
+            stack.extend(reversed(children))
+        elif old != new and not (old != old and new != new):
+            # (NaN is the only value that differs from itself)
+            changes.append(Change(MODIFIED, path, old, new))
+    return changes
+
+class Differ(object):
+    '''
+    Differ remembers the last tree it was given and returns the changes
+    from it to the next one.
+
+    Example:
+
+        differ = Differ(keys={'reading': 'id'})
+        while True:
+            for change in differ(c.Sensors.getReadings(1)):
+                print change
+            time.sleep(5)
+    '''
+    def __init__(self, keys=None):
+        self.keys = keys
+        self.last = None
+
+    def __call__(self, obj):
+        if self.last is None:
+            changes = [Change(ADDED, '', None, obj)]
+        else:
+            changes = diff(self.last, obj, self.keys)
+        self.last = obj
+        return changes
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
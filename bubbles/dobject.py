@@ -29,6 +29,8 @@
 #####################################################
 
 from bubbles.xmlimpl import ET
+from bubbles.util.keylist import KeyList
+from bubbles.util import strpool
 
 def _ind(i):
     return i*4
@@ -103,7 +105,7 @@ class DynamicObject(object):
                 v = v2
             self[k] = v
 
-    def __fromxml__(self, elem, ignore=[]):
+    def __fromxml__(self, elem, ignore=[], children=None):
         '''
         Set fields in the object from an XML element.
 
@@ -111,21 +113,32 @@ class DynamicObject(object):
         @param elem: The XML element
         @type ignore: list
         @param ignore: XML tags/attributes to ignore
+        @type children: list
+        @param children: Optional.  The child elements to examine.  Defaults
+            to all of elem's children.
 
         This method will iterate over the element's children and build
         sub child objects for each child node.
         '''
+        # Share names and values through the active string pool, if any
+        pool = strpool.current()
+
         # First add the element attributes.  Prepend attributes with
         # __attrchar__
         at = self.__attrchar__
         for k,v in elem.attrib.items():
             k = at+k
             if k not in ignore:
+                if pool is not None:
+                    k = pool(k)
+                    v = pool(v)
                 self[k] = v
 
         if len(elem):
             # Examine the children of elem
-            for child in elem.getchildren():
+            if children is None:
+                children = elem.getchildren()
+            for child in children:
                 # ignore comments
                 if child.tag == ET.Comment:
                     continue
@@ -141,6 +154,9 @@ class DynamicObject(object):
                     cval = DynamicObject(child)
                 else:
                     cval = child.text
+                if pool is not None:
+                    tag = pool(tag)
+                    cval = pool(cval)
 
                 # Check if we already have a field with this name.
                 # If not, its just a value.  Otherwise, turn the value
@@ -155,7 +171,10 @@ class DynamicObject(object):
         elif elem.text is not None:
             # If there were no children, then this is a "property" object.
             self.__property__ = 'value'
-            self['value'] = elem.text
+            if pool is not None:
+                self['value'] = pool(elem.text)
+            else:
+                self['value'] = elem.text
 
     def __init__(self, *args, **kwargs):
         '''
@@ -182,7 +201,7 @@ class DynamicObject(object):
             self.__validate__ = validate
         self.__relax__ = kwargs.pop('__relax__', False)
 
-        self.__keylist__ = []
+        self.__keylist__ = KeyList()
         for arg in args:
             if isinstance(arg, (dict, list, DynamicObject)):
                 self.__fromiter__(arg)
@@ -198,8 +217,7 @@ class DynamicObject(object):
         self.__fromiter__(kwargs.items())
 
     def __setattr__(self, name, value):
-        if not (name.startswith('__') and name.endswith('__')) and \
-                name not in self.__keylist__:
+        if not (name.startswith('__') and name.endswith('__')):
             self.__keylist__.append(name)
         self.__dict__[name] = value
 
@@ -0,0 +1,214 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Streaming JSON encoding and decoding of DynamicObjects
+#
+#####################################################
+from bubbles.xmlimpl import ET
+from bubbles.dobject import DynamicObject
+from bubbles.util.ordered_dict import OrderedDict
+from json.encoder import encode_basestring_ascii
+from datetime import datetime, date, time
+import json
+
+# Flush dump's buffer after this many chunks
+_BUFFER = 1024
+
+def _scalar(value):
+    '''
+    Encode a value that isn't a container as JSON.
+    '''
+    if isinstance(value, basestring):
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, (int, long)):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value in (float('inf'), float('-inf')):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return repr(value)
+    if isinstance(value, (datetime, date, time)):
+        return '"%s"' % value.isoformat()
+    if ET.iselement(value):
+        return encode_basestring_ascii(ET.tostring(value))
+    return encode_basestring_ascii(unicode(value))
+
+def _fields(obj, attrprefix, classname):
+    '''
+    Yield the (key, value) pairs of a DynamicObject for encoding.
+    '''
+    if classname:
+        yield ('__classname__', obj.__class__.__name__)
+    at = obj.__attrchar__
+    for k, v in obj:
+        if attrprefix is not None and at and k.startswith(at):
+            k = attrprefix + k[len(at):]
+        yield (k, v)
+
+def iterencode(obj, attrprefix=None, classname=False):
+    '''
+    Encode a tree of DynamicObjects (and lists, dicts and primitive
+    values) as JSON, yielding the encoding in chunks.
+
+    The tree is walked with an explicit stack, so deep trees don't hit
+    the recursion limit.  XML attribute fields keep their __attrchar__
+    prefix unless attrprefix is given.  Property objects are encoded
+    like any other object, with their text under the 'value' key.
+
+    @param obj: The object to encode
+    @type attrprefix: str
+    @param attrprefix: Optional.  Replace the __attrchar__ prefix of
+        XML attribute fields with this prefix (e.g. '@').
+    @type classname: bool
+    @param classname: Optional.  Add a __classname__ key to each object,
+        as __asdict__ does.
+    '''
+    # Each level of the stack is an iterator of (key, value) pairs, the
+    # kind of container ('o'bject, 'a'rray or None at the top) and
+    # whether we've emitted its first member yet.
+    iters = [iter(((None, obj),))]
+    kinds = [None]
+    firsts = [True]
+    while iters:
+        try:
+            (key, value) = next(iters[-1])
+        except StopIteration:
+            iters.pop()
+            firsts.pop()
+            kind = kinds.pop()
+            if kind == 'o':
+                yield '}'
+            elif kind == 'a':
+                yield ']'
+            continue
+
+        kind = kinds[-1]
+        if firsts[-1]:
+            firsts[-1] = False
+        elif kind:
+            yield ', '
+        if kind == 'o':
+            yield encode_basestring_ascii(unicode(key))
+            yield ': '
+
+        if isinstance(value, DynamicObject):
+            yield '{'
+            iters.append(_fields(value, attrprefix, classname))
+            kinds.append('o')
+            firsts.append(True)
+        elif isinstance(value, dict):
+            yield '{'
+            iters.append(value.iteritems())
+            kinds.append('o')
+            firsts.append(True)
+        elif isinstance(value, (list, tuple)):
+            yield '['
+            iters.append((None, v) for v in value)
+            kinds.append('a')
+            firsts.append(True)
+        else:
+            yield _scalar(value)
+
+def dumps(obj, **kwargs):
+    '''
+    Encode obj as a JSON string.  See L{iterencode} for the arguments.
+    '''
+    return ''.join(iterencode(obj, **kwargs))
+
+def dump(obj, fp, **kwargs):
+    '''
+    Encode obj as JSON and write it to the file-like object fp.  See
+    L{iterencode} for the arguments.
+    '''
+    buf = []
+    for chunk in iterencode(obj, **kwargs):
+        buf.append(chunk)
+        if len(buf) >= _BUFFER:
+            fp.write(''.join(buf))
+            buf = []
+    if buf:
+        fp.write(''.join(buf))
+
+def loads(s, cls=None, attrprefix=None):
+    '''
+    Decode JSON into DynamicObjects, or into instances of a SchemaObject
+    class.
+
+    @type s: str
+    @param s: The JSON
+    @type cls: class
+    @param cls: Optional.  A class built by a Builder.  The decoded object
+        (or each object of a decoded list) is built by passing it to the
+        class, so nested objects get their schema types too.
+    @type attrprefix: str
+    @param attrprefix: Optional.  The prefix used for XML attribute fields
+        when the JSON was encoded.
+    '''
+    if cls is not None:
+        at = cls.__attrchar__
+    else:
+        at = DynamicObject.__attrchar__
+
+    def pairs(items):
+        ret = []
+        for (k, v) in items:
+            if k == '__classname__':
+                continue
+            if attrprefix is not None and k.startswith(attrprefix):
+                k = at + k[len(attrprefix):]
+            ret.append((k, v))
+        if cls is not None:
+            return OrderedDict(ret)
+        obj = DynamicObject(ret)
+        # An object with only attributes and a value is a property object
+        if 'value' in obj and all(k == 'value' or (at and k.startswith(at)) for k, v in ret):
+            obj.__property__ = 'value'
+        return obj
+
+    data = json.loads(s, object_pairs_hook=pairs)
+    if cls is None:
+        return data
+    if isinstance(data, list):
+        return [cls(x) for x in data]
+    return cls(data)
+
+def load(fp, **kwargs):
+    '''
+    Decode JSON from the file-like object fp.  See L{loads} for the
+    arguments.
+    '''
+    return loads(fp.read(), **kwargs)
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -0,0 +1,33 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#
+#####################################################
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
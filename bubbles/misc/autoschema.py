@@ -40,6 +40,7 @@ from bubbles.util import ns
 from collections import OrderedDict
 import sys
 import json
+import multiprocessing
 import re
 from getopt import getopt
 
@@ -70,20 +71,145 @@ Extension = b.factory('Extension')
 # across multiple runs, we need to preserve this information.
 PATH = '{urn:nonstd}path'
 
+class _Node(object):
+    '''
+    What streaming inference remembers about an open element: its
+    attributes and one entry per distinct child name, so memory is
+    bounded by the schema rather than the document.
+
+    Each entry in fields is [type, isnone, islist, summary], where
+    summary holds the (attrib, text) of a child that looked like a
+    primitive type, in case a repeat of it turns it into a list.  The
+    names of the fields are kept in order in names.
+    '''
+    __slots__ = ('tag', 'parent', 'attrib', 'fields', 'names', 'forced', 'ct', 'cttype', 'newtype')
+    def __init__(self, tag, parent, attrib, forced):
+        self.tag = tag
+        self.parent = parent
+        self.attrib = attrib
+        self.fields = {}
+        self.names = []
+        self.forced = forced
+        self.ct = None
+
 
 class AutoSchema:
     def __init__(self, tns):
         self.schema = Schema(targetNamespace=tns, elementFormDefault='qualified')
-        self.typeinfo = {"attributes":{}, "elements":{}}
+        self.typeinfo = {"attributes":{}, "elements":{}, "types":{}, "positions":{}}
+        # The types opened and closed while guessing, in order, for
+        # combine().  Each type is opened by (parent type names, tag).
+        self.trace = []
+        self.opened = set()
+        # Elements seen with more than one type: name -> [types]
+        self.conflicts = OrderedDict()
+        self._reindex()
+
+    def _reindex(self):
+        # What stream() has already folded into each type
+        self.folded = set()
+        # Indexes of the complexTypes by name, and of the elements and
+        # attributes of each container by name, so that adding to the
+        # schema doesn't have to scan it.  The container indexes are
+        # keyed by id() and built the first time a container is used.
+        self.types = dict((t.name, t) for t in self.schema.complexType)
+        self.elements = {}
+        self.attributes = {}
+
+    def _index(self, table, container, items):
+        try:
+            return table[id(container)][1]
+        except KeyError:
+            pass
+        names = dict((x.name, x) for x in items)
+        # Keep a reference to the container so its id stays unique
+        table[id(container)] = (container, names)
+        return names
+
+    def _addType(self, ct):
+        self.schema.complexType.append(ct)
+        self.types[ct.name] = ct
 
-    def merge(self, filename):
+    def _closeType(self, ct):
+        # A type guessed from the documents is done
+        self._addType(ct)
+        self.trace.append(('close', ct.name))
+
+    @staticmethod
+    def parse(text):
         # We change the namespace of XMLSchema to something else because
         # the schema processor in the bubbles library can't operate on the
         # XS namespace.  Hack...
-        doc = file(filename).read()
-        doc = doc.replace(ns.XS, 'urn:metaschema')
-        xsd = ET.fromstring(doc)
-        self.schema = Schema(xsd)
+        text = text.replace(ns.XS, 'urn:metaschema')
+        xsd = ET.fromstring(text)
+        return Schema(xsd)
+
+    def merge(self, filename):
+        self.schema = self.parse(file(filename).read())
+        self._reindex()
+
+    def combine(self, schema, trace, conflicts=()):
+        '''
+        Merge a schema guessed by another AutoSchema into this one, as
+        if its documents had been guessed here after this one's.
+
+        The other AutoSchema named its types without knowing about the
+        types here, so the same name can mean types at different paths.
+        Replaying its trace looks up or names each type like guessing
+        here would have.  The elements and attributes of each of its
+        types are then merged into the type that it became here, with
+        the element types renamed to match.
+        '''
+        theirs = dict((ct.name, ct) for ct in schema.complexType)
+        # Their parent type names -> ours
+        chains = {(): []}
+        # (their parent type names, tag) -> our type name
+        names = {}
+        # Their type name -> our new type, added when it is closed
+        pending = OrderedDict()
+        folds = []
+        for event in trace:
+            if event[0] == 'close':
+                ct = pending.pop(event[1], None)
+                if ct is not None:
+                    self._closeType(ct)
+                continue
+            (_, parent, tag, name) = event
+            parent = tuple(parent)
+            ours = chains[parent]
+            (ct, cttype, newtype) = self._openType(tag, ours)
+            names[(parent, tag)] = ct.name
+            chains[parent + (name,)] = ours + [ct.name]
+            if newtype:
+                pending[name] = ct
+            folds.append((parent + (name,), theirs[name], ct, cttype))
+        for ct in pending.values():
+            self._closeType(ct)
+
+        for (chain, other, ct, cttype) in folds:
+            # Whatever kind of group they put the elements in, they go
+            # into the one this type has
+            for seq in ('sequence', 'all', 'choice'):
+                if not other[seq]:
+                    continue
+                for el in other[seq].element:
+                    el.type = names.get((chain, el.name), el.type)
+                    self.addElement(ct, el, cttype)
+            for at in other.attribute:
+                self._addAttribute(ct, at)
+        for el in schema.element:
+            el.type = names.get(((), el.name), el.type)
+            self._addElement(self.schema, el)
+        for (name, types) in conflicts:
+            self._conflict(name, *types)
+
+    def _conflict(self, name, *types):
+        seen = self.conflicts.get(name)
+        if seen is None:
+            seen = self.conflicts[name] = []
+        for t in types:
+            if t not in seen:
+                seen.append(t)
 
     def guess(self, filename):
         text = file(filename).read()
@@ -95,6 +221,113 @@ class AutoSchema:
         el = Element(name=tag, type=root.name)
         self._addElement(self.schema, el)
 
+    def stream(self, filename):
+        '''
+        Guess the schema of a document like guess(), but from iterparse
+        events, without building the document tree or a DynamicObject.
+        Elements are dropped as soon as they have been examined.
+
+        The types come out the same as guess() would make them, except
+        that types created for children with interleaved tags (like
+        <A/><B/><A/>) may be in a different order in the schema.
+        '''
+        stack = []
+        for (event, elem) in ET.iterparse(filename, events=('start', 'end')):
+            tag = elem.tag.split('}')[-1]
+            if event == 'start':
+                forced = not stack
+                parent = []
+                if stack:
+                    up = stack[-1]
+                    self._open(up)
+                    parent = up.parent + [up.ct.name]
+                    f = up.fields.get(tag)
+                    if f is not None and (f[2] or not f[1]):
+                        # This is a repeat, so the field is a list and
+                        # all of its items are complexTypes.
+                        forced = True
+                        if f[3] is not None:
+                            item = _Node(tag, parent, f[3][0], True)
+                            self._close(item, f[3][1])
+                            f[3] = None
+                stack.append(_Node(tag, parent, elem.attrib.keys(), forced))
+                continue
+
+            node = stack.pop()
+            text = elem.text
+            summary = None
+            isnone = False
+            if not (node.attrib or node.fields) and stack:
+                # Text only
+                type = 'xs:string'
+                isnone = text is None
+            else:
+                type = None
+                if not node.forced:
+                    keys = dict(('_' + k, elem.get(k)) for k in node.attrib)
+                    keys.update((k, None) for k in node.fields)
+                    if not node.fields and text is not None:
+                        keys['value'] = text
+                    type = self.checktype(keys)
+                if type:
+                    if not node.fields:
+                        summary = (node.attrib, text)
+                else:
+                    self._close(node, text)
+                    type = node.ct.name
+
+            if stack:
+                up = stack[-1]
+                f = up.fields.get(tag)
+                if f is None:
+                    up.names.append(tag)
+                    up.fields[tag] = [type, isnone, False, summary]
+                elif f[1] and not f[2]:
+                    up.fields[tag] = [type, isnone, False, summary]
+                else:
+                    up.fields[tag] = [type, isnone, True, None]
+            else:
+                self._addElement(self.schema, Element(name=tag, type=type))
+
+            # Drop the element and the siblings we're done with
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def _open(self, node):
+        if node.ct is None:
+            (node.ct, node.cttype, node.newtype) = self._openType(node.tag, node.parent)
+
+    def _close(self, node, text):
+        '''
+        Fold what streaming learned about an element into its type.
+        '''
+        self._open(node)
+        ct = node.ct
+        # Adding the same attribute or element to a type twice doesn't
+        # change it, so skip what has been added before.
+        folded = self.folded
+        for k in node.attrib:
+            key = (id(ct), '@', k)
+            if key not in folded:
+                self.addAttribute(ct, k, 'xs:string')
+                folded.add(key)
+        fields = [(name,) + tuple(node.fields[name][::2]) for name in node.names]
+        if not fields and text is not None:
+            fields = [('value', 'xs:string', False)]
+        for (name, type, islist) in fields:
+            key = (id(ct), node.tag, name, type, islist)
+            if key in folded:
+                continue
+            el = Element(name=name, type=type)
+            if islist:
+                el.minOccurs = 0
+                el.maxOccurs = "unbounded"
+            self._addField(ct, node.cttype, node.tag, el)
+            folded.add(key)
+        if node.newtype:
+            self._closeType(ct)
+
     def output(self):
         # Since the MetaSchema isn't in the XMLSchema namespace (but it's
         # meant to be, except for the aforementioned limitiaion in bubbles),
@@ -116,7 +349,7 @@ class AutoSchema:
         ct = ComplexType(name=name)
         for attr, type in attrs:
             ct.attribute.append(Attribute(name=attr, type=type))
-        self.schema.complexType.append(ct)
+        self._addType(ct)
 
     def ilo_primitives(self):
         # iLO uses lots of attributes in it's schema documents.  While
@@ -139,7 +372,7 @@ class AutoSchema:
                 extension=Extension(base="xs:string"))
         pcap.simpleContent.extension.attribute.append(
                 Attribute(name="MODE", type="xs:string"))
-        self.schema.complexType.append(pcap)
+        self._addType(pcap)
 
     @staticmethod
     def checkvalue(val):
@@ -157,7 +390,7 @@ class AutoSchema:
     def checktype(node):
         if len(node)==1:
             if '_VALUE' in node:
-                return AutoSchema.checkvalue(node._VALUE)
+                return AutoSchema.checkvalue(node['_VALUE'])
             if '_STATUS' in node:
                 return 'StatusValue'
         if len(node)==2:
@@ -186,19 +419,23 @@ class AutoSchema:
         self._addElement(ct[seq], el, fullname)
 
     def _addElement(self, seq, el, fullname=None):
-        for i in range(len(seq.element)):
+        names = self._index(self.elements, seq, seq.element)
+        a = names.get(el.name)
+        if a is not None:
+            if a.type != el.type:
+                self._conflict(fullname or el.name, a.type, el.type)
             # Possibly replace the element if we already have one
             # with the same name
-            a = seq.element[i]
-            if a.name == el.name:
-                a = (a.minOccurs, a.maxOccurs)
-                b = (el.minOccurs, el.maxOccurs)
-                # The "greater" version of min/max is the one we want
-                if b>a:
-                    seq.element[i] = el
-                break
+            b = (el.minOccurs, el.maxOccurs)
+            # The "greater" version of min/max is the one we want
+            if b>(a.minOccurs, a.maxOccurs):
+                for i in range(len(seq.element)):
+                    if seq.element[i] is a:
+                        seq.element[i] = el
+                        break
+                names[el.name] = el
         else:
-            # If the for loop didn't exit via break
+            names[el.name] = el
             index = -1
             if fullname:
                 index = self.typeinfo['positions'].get(fullname, -1)
@@ -214,21 +451,31 @@ class AutoSchema:
         attrs = self.typeinfo['attributes'].get(fullname, {})
         for k, v in attrs.items():
             setattr(at, k, v)
+        self._addAttribute(ct, at)
 
-        for i in range(len(ct.attribute)):
+    def _addAttribute(self, ct, at):
+        names = self._index(self.attributes, ct, ct.attribute)
+        a = names.get(at.name)
+        if a is not None:
             # Replace the attribute if we already have it
-            if ct.attribute[i].name == at.name:
-                ct.attribute[i] = at
-                break
+            for i in range(len(ct.attribute)):
+                if ct.attribute[i] is a:
+                    ct.attribute[i] = at
+                    break
         else:
-            # If the for loop didn't exit via break
             ct.attribute.append(at)
-
-    def complexType(self, tag, node, parent=[]):
+        names[at.name] = at
+
+    def _openType(self, tag, parent):
+        '''
+        Find or create the complexType for tag under the parent types.
+        Returns (ct, cttype, newtype); new types are not added to the
+        schema until the caller is done with them.
+        '''
         tt = self.typename(tag)
         # Keep "Root" out of the pathname
         path = '/'.join(parent[1:])
-        types = dict((t.name, t) for t in self.schema.complexType)
+        types = self.types
         newtype = False
         if tt in types:
             # Heuristic: if the node in complextypes has the same path as
@@ -279,8 +526,21 @@ class AutoSchema:
         # Choice node.
         #if tt == 'Ribcl' and newtype:
         #    ct.choice = Choice()
+        key = (tuple(parent), tag)
+        if key not in self.opened:
+            self.opened.add(key)
+            self.trace.append(('open', key[0], tag, ct.name))
+        return (ct, cttype, newtype)
+
+    def _addField(self, ct, cttype, tag, el):
+        if tag == 'RIBCL' and el.name != 'RESPONSE':
+            el.minOccurs = 0
+            el.maxOccurs = 1
+        self.addElement(ct, el, cttype)
 
-        parent = parent + [tt]
+    def complexType(self, tag, node, parent=[]):
+        (ct, cttype, newtype) = self._openType(tag, parent)
+        parent = parent + [ct.name]
         #print >>sys.stderr, "Handling ", path, tag, node
         for k,v in node:
             if k.startswith('_'):
@@ -311,16 +571,31 @@ class AutoSchema:
             else:
                 el = Element(name=k, type='xs:string')
 
-            if tag == 'RIBCL' and el.name != 'RESPONSE':
-                el.minOccurs = 0
-                el.maxOccurs = 1
-            
-            self.addElement(ct, el, cttype)
+            self._addField(ct, cttype, tag, el)
 
         if newtype:
-            self.schema.complexType.append(ct)
+            self._closeType(ct)
         return ct
 
+def _shard(args):
+    '''
+    Guess a partial schema from a shard of the input files in a worker
+    process.
+    '''
+    (tns, merge, typeinfo, streaming, xmlfiles) = args
+    a = AutoSchema(tns)
+    a.ilo_primitives()
+    if merge:
+        a.merge(merge)
+    if typeinfo:
+        a.load_typeinfo(typeinfo)
+    for xmlfile in xmlfiles:
+        if streaming:
+            a.stream(xmlfile)
+        else:
+            a.guess(xmlfile)
+    return (a.output(), a.trace, a.conflicts.items())
+
 def usage(prog):
     print """Usage: %s [-o filename] [xmlfiles]...
 
@@ -329,23 +604,33 @@ Examine XML and guess an XSD schema for it.
     -m <filename>: Read the schema in filename and merge the guesswork with it.
     -n <namespace>: Set the targetNamespace.
     -o <filename>: Write the schema to filename (default stdout)
+    -s: Stream the XML files instead of loading them, for large files.
+    -j <jobs>: Guess from the XML files in this many processes and
+        merge the results.  Files are sharded and the partial schemas
+        merged in command line order, so the output is repeatable.
     -t <filename>: Load type hints from filename.
 """ % prog
     return 1
 
 def main(argv):
-    opts = getopt(argv[1:], 'm:n:o:t:h?')
+    opts = getopt(argv[1:], 'j:m:n:o:st:h?')
     ofile = None
     merge = None
     typeinfo = None
     tns = 'urn:xxx'
+    jobs = 1
+    streaming = False
     for (opt, val) in opts[0]:
-        if opt == '-m':
+        if opt == '-j':
+            jobs = int(val)
+        elif opt == '-m':
             merge = val
         elif opt == '-n':
             tns = val
         elif opt == '-o':
             ofile = val
+        elif opt == '-s':
+            streaming = True
         elif opt == '-t':
             typeinfo = val
         elif opt in ('-h', '-?'):
@@ -362,8 +647,30 @@ def main(argv):
     if typeinfo:
         a.load_typeinfo(typeinfo)
 
-    for xmlfile in opts[1]:
-        a.guess(xmlfile)
+    xmlfiles = opts[1]
+    if jobs > 1 and len(xmlfiles) > 1:
+        # Give each process a contiguous run of files so that each
+        # partial schema sees the files in their original order
+        jobs = min(jobs, len(xmlfiles))
+        size = (len(xmlfiles) + jobs - 1) // jobs
+        shards = [(tns, merge, typeinfo, streaming, xmlfiles[i:i+size])
+                for i in range(0, len(xmlfiles), size)]
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for (text, trace, conflicts) in pool.map(_shard, shards):
+                a.combine(a.parse(text), trace, conflicts)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for xmlfile in xmlfiles:
+            if streaming:
+                a.stream(xmlfile)
+            else:
+                a.guess(xmlfile)
+
+    for (name, types) in a.conflicts.items():
+        print >>sys.stderr, "Warning: %s has conflicting types: %s" % (name, ', '.join(types))
 
     if ofile:
         ofile = file(ofile, 'w')
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Microbenchmarks for the inner loops of marshalling: DynamicObject
+#    and SchemaObject conversion to and from XML, the xs: type
+#    converters and namespace expansion.  Results are written as JSON.
+#
+#    Run from the top of the source tree:
+#        PYTHONPATH=. python bubbles/misc/benchmarshal.py -o marshal.json
+#
+#####################################################
+from bubbles import __version__
+from bubbles.xsd.schema import SchemaLoader, Builder
+from bubbles.xsd.types import converters
+from bubbles.dobject import DynamicObject
+from bubbles.util.urlcache import URLCache
+from bubbles.util import ns
+from bubbles.xmlimpl import ET
+from timeit import default_timer as timer
+from datetime import datetime, date, time
+from getopt import getopt
+import gc
+import sys
+import json
+import platform
+
+TNS = 'urn:benchmarshal'
+
+# Template shapes.  Wide has many simple fields, Chain is a deep
+# extension chain, Node nests itself, Lists holds many items,
+# Attrs is mostly attributes and Any is mostly xs:any content.
+XSD = '''<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="%(tns)s" targetNamespace="%(tns)s" elementFormDefault="qualified">
+  <xs:complexType name="Wide"><xs:sequence>
+%(wide)s
+  </xs:sequence></xs:complexType>
+  <xs:complexType name="Chain0"><xs:sequence>
+    <xs:element name="c0a" type="xs:int"/><xs:element name="c0b" type="xs:string"/>
+  </xs:sequence></xs:complexType>
+%(chain)s
+  <xs:complexType name="Node"><xs:sequence>
+    <xs:element name="id" type="xs:int"/>
+    <xs:element name="name" type="xs:string"/>
+    <xs:element name="child" type="tns:Node" minOccurs="0"/>
+  </xs:sequence></xs:complexType>
+  <xs:complexType name="Item"><xs:sequence>
+    <xs:element name="id" type="xs:int"/>
+    <xs:element name="value" type="xs:double"/>
+    <xs:element name="ok" type="xs:boolean"/>
+  </xs:sequence></xs:complexType>
+  <xs:complexType name="Lists"><xs:sequence>
+    <xs:element name="item" type="tns:Item" minOccurs="0" maxOccurs="unbounded"/>
+    <xs:element name="tag" type="xs:string" minOccurs="0" maxOccurs="unbounded"/>
+  </xs:sequence></xs:complexType>
+  <xs:complexType name="Attrs"><xs:sequence>
+    <xs:element name="name" type="xs:string"/>
+  </xs:sequence>
+%(attrs)s
+  </xs:complexType>
+  <xs:complexType name="Any"><xs:sequence>
+    <xs:element name="id" type="xs:int"/>
+    <xs:element name="name" type="xs:string"/>
+    <xs:any minOccurs="0" maxOccurs="unbounded"/>
+  </xs:sequence></xs:complexType>
+</xs:schema>
+'''
+
+WIDE = 50
+CHAIN = 10
+NEST = 20
+ITEMS = 100
+ATTRS = 20
+EXTRA = 20
+
+# Sample values for each xs: type, as text
+SAMPLES = {
+    'xs:string': 'hello world',
+    'xs:boolean': 'true',
+    'xs:integer': '123456',
+    'xs:byte': '-12',
+    'xs:short': '1234',
+    'xs:int': '123456',
+    'xs:long': '1234567890123',
+    'xs:unsignedByte': '200',
+    'xs:unsignedShort': '60000',
+    'xs:unsignedInt': '4000000000',
+    'xs:unsignedLong': '18000000000000000000',
+    'xs:decimal': '3.25',
+    'xs:float': '1.5',
+    'xs:double': '2.718281828',
+    'xs:dateTime': '2012-01-02T03:04:05.123456Z',
+    'xs:date': '2012-01-02',
+    'xs:time': '03:04:05',
+}
+
+FIELDS = ('xs:string', 'xs:int', 'xs:boolean', 'xs:dateTime', 'xs:double')
+
+def schema():
+    wide = '\n'.join('    <xs:element name="w%d" type="%s"/>' % (i, FIELDS[i % len(FIELDS)])
+            for i in range(WIDE))
+    chain = '\n'.join('  <xs:complexType name="Chain%d"><xs:complexContent>'
+            '<xs:extension base="tns:Chain%d"><xs:sequence>'
+            '<xs:element name="c%da" type="xs:int"/><xs:element name="c%db" type="xs:string"/>'
+            '</xs:sequence></xs:extension></xs:complexContent></xs:complexType>' % (i, i-1, i, i)
+            for i in range(1, CHAIN))
+    attrs = '\n'.join('    <xs:attribute name="a%d" type="%s"/>' % (i, FIELDS[i % len(FIELDS)])
+            for i in range(ATTRS))
+    return XSD % { 'tns': TNS, 'wide': wide, 'chain': chain, 'attrs': attrs }
+
+def _el(parent, name, text):
+    el = ET.SubElement(parent, '{%s}%s' % (TNS, name))
+    el.text = text
+    return el
+
+def _root(name):
+    return ET.Element('{%s}%s' % (TNS, name), nsmap={'tns': TNS})
+
+def documents():
+    '''
+    Build an XML instance of each shape.  Returns {shape: (type, element)}.
+    '''
+    docs = {}
+
+    root = _root('wide')
+    for i in range(WIDE):
+        _el(root, 'w%d' % i, SAMPLES[FIELDS[i % len(FIELDS)]])
+    docs['wide'] = ('Wide', root)
+
+    root = _root('chain')
+    for i in range(CHAIN):
+        _el(root, 'c%da' % i, str(i))
+        _el(root, 'c%db' % i, 'chain')
+    docs['chain'] = ('Chain%d' % (CHAIN-1), root)
+
+    root = node = _root('node')
+    for i in range(NEST):
+        _el(node, 'id', str(i))
+        _el(node, 'name', 'node%d' % i)
+        if i < NEST-1:
+            node = _el(node, 'child', None)
+    docs['nested'] = ('Node', root)
+
+    root = _root('lists')
+    for i in range(ITEMS):
+        item = _el(root, 'item', None)
+        _el(item, 'id', str(i))
+        _el(item, 'value', '%d.5' % i)
+        _el(item, 'ok', 'true')
+    for i in range(ITEMS):
+        _el(root, 'tag', 'tag%d' % i)
+    docs['lists'] = ('Lists', root)
+
+    root = _root('attrs')
+    for i in range(ATTRS):
+        root.set('a%d' % i, SAMPLES[FIELDS[i % len(FIELDS)]])
+    _el(root, 'name', 'attrs')
+    docs['attrs'] = ('Attrs', root)
+
+    root = _root('any')
+    _el(root, 'id', '1')
+    _el(root, 'name', 'any')
+    for i in range(EXTRA):
+        _el(root, 'extra%d' % i, 'x%d' % i)
+    docs['any'] = ('Any', root)
+    return docs
+
+def measure(func, mintime, repeat):
+    '''
+    Time func.  The number of calls per run is raised until a run takes
+    at least mintime; the best of repeat runs is reported.
+
+    Also counts the gc-tracked objects (containers and instances) that
+    the result of a call keeps alive.  This is not an allocation count:
+    strings, numbers and temporary objects aren't included, and Python 2
+    has no tracemalloc to count them.
+    '''
+    n = 1
+    while True:
+        start = timer()
+        for i in xrange(n):
+            func()
+        elapsed = timer() - start
+        if elapsed >= mintime:
+            break
+        n *= 2 if elapsed < mintime / 10 else max(2, int(mintime / max(elapsed, 1e-9)))
+    best = elapsed
+    for r in range(repeat - 1):
+        start = timer()
+        for i in xrange(n):
+            func()
+        best = min(best, timer() - start)
+
+    calls = min(n, 1000)
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        keep = [func() for i in xrange(calls)]
+        after = len(gc.get_objects())
+    finally:
+        if enabled:
+            gc.enable()
+    retained = float(after - before - 1) / calls
+    del keep
+    return {
+        'calls': n,
+        'ops_per_sec': n / best,
+        'usec_per_op': best / n * 1e6,
+        'retained_objects_per_op': max(retained, 0.0),
+    }
+
+def benchmarks():
+    '''
+    Build the list of (group, name, callable) benchmarks.
+    '''
+    loader = SchemaLoader()
+    loader.urlcache = URLCache()
+    loader.load(ET.fromstring(schema()))
+    builder = Builder(loader, TNS)
+    builder.cache = {}
+    docs = documents()
+    ret = []
+
+    # Namespace expansion
+    nsmap = {'tns': TNS, 'xs': ns.XS}
+    resolver = ns.Resolver(nsmap)
+    qualified = '{%s}name' % TNS
+    ret.append(('ns', 'expand', lambda: ns.expand('tns:name', nsmap)))
+    ret.append(('ns', 'expand_default', lambda: ns.expand('soapenv:Body')))
+    ret.append(('ns', 'split', lambda: ns.split(qualified, nsmap)))
+    ret.append(('ns', 'split_default', lambda: ns.split(qualified)))
+    ret.append(('ns', 'resolver_expand', lambda: resolver.expand('tns:name')))
+    ret.append(('ns', 'resolver_split', lambda: resolver.split(qualified)))
+
+    # Converters
+    for (typestr, text) in sorted(SAMPLES.items()):
+        conv = converters[typestr]
+        value = conv.fromstr(text)
+        ret.append(('convert', '%s.fromstr' % typestr, lambda c=conv, t=text: c.fromstr(t)))
+        ret.append(('convert', '%s.decode' % typestr, lambda c=conv, t=text: c.decode(t)))
+        ret.append(('convert', '%s.tostr' % typestr, lambda c=conv, v=value: c.tostr(v)))
+
+    # Schemaless and schema objects, per shape
+    for (shape, (typename, elem)) in sorted(docs.items()):
+        cls = builder.factory('{%s}%s' % (TNS, typename))
+        obj = cls(elem)
+        dobj = DynamicObject(elem)
+        items = [(k, v) for k, v in obj]
+        tag = elem.tag
+        ret.append(('dynamic', '%s.fromxml' % shape, lambda e=elem: DynamicObject(e)))
+        ret.append(('dynamic', '%s.xml' % shape, lambda o=dobj, t=tag: o.__xml__(t)))
+        ret.append(('schema', '%s.fromxml' % shape, lambda c=cls, e=elem: c(e)))
+        ret.append(('schema', '%s.fromiter' % shape, lambda c=cls, i=items: c(i)))
+        ret.append(('schema', '%s.xml' % shape, lambda o=obj, t=tag: o.__xml__(t)))
+    return ret
+
+def usage(prog):
+    print """Usage: %s [-o filename] [-k pattern] [-r repeat] [-t seconds]
+
+Microbenchmark the marshalling inner loops and write the results as JSON.
+
+    -o <filename>: Write the results to filename (default stdout)
+    -k <pattern>: Only run benchmarks whose group.name contains pattern
+    -r <repeat>: Report the best of this many runs (default 3)
+    -t <seconds>: Minimum time for each run (default 0.2)
+""" % prog
+    return 1
+
+def main(argv):
+    opts = getopt(argv[1:], 'o:k:r:t:h?')
+    ofile = None
+    pattern = None
+    repeat = 3
+    mintime = 0.2
+    for (opt, val) in opts[0]:
+        if opt == '-o':
+            ofile = val
+        elif opt == '-k':
+            pattern = val
+        elif opt == '-r':
+            repeat = int(val)
+        elif opt == '-t':
+            mintime = float(val)
+        elif opt in ('-h', '-?'):
+            return usage(argv[0])
+        else:
+            print "Unknown option:", opt
+            return usage(argv[0])
+
+    results = []
+    for (group, name, func) in benchmarks():
+        fullname = '%s.%s' % (group, name)
+        if pattern and pattern not in fullname:
+            continue
+        print >>sys.stderr, "%s..." % fullname
+        result = measure(func, mintime, repeat)
+        result['group'] = group
+        result['name'] = name
+        results.append(result)
+
+    report = {
+        'benchmark': 'marshal',
+        'bubbles': __version__,
+        'python': platform.python_version(),
+        'lxml': ET.__version__,
+        'repeat': repeat,
+        'mintime': mintime,
+        'results': results,
+    }
+    if ofile:
+        ofile = file(ofile, 'w')
+    else:
+        ofile = sys.stdout
+    json.dump(report, ofile, indent=2, sort_keys=True)
+    print >>ofile
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
+
+# vim: ts=4 sts=4 sw=4 expandtab:
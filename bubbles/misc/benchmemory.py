@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Benchmark of the memory retained by deserialized responses, broken
+#    down by kind of object, and of the process-lifetime caches.
+#    Results are written as JSON.
+#
+#    Run from the top of the source tree:
+#        PYTHONPATH=. python bubbles/misc/benchmemory.py -o memory.json
+#
+#####################################################
+from bubbles import __version__
+from bubbles.xsd.schema import SchemaLoader, SchemaObject, Builder, CompactSchemaObject
+from bubbles.xsd import types
+from bubbles.dobject import DynamicObject
+from bubbles.util.keylist import KeyList
+from bubbles.util.urlcache import URLCache
+from bubbles.util.strpool import StringPool, using
+from bubbles.util import memory
+from bubbles.util import ns
+from bubbles.xmlimpl import ET
+from bubbles.misc.benchmarshal import schema, TNS
+from getopt import getopt
+import gc
+import multiprocessing
+import sys
+import json
+import types as pytypes
+import platform
+
+# Objects that belong to the program rather than to a response
+_SKIP = (type, pytypes.ClassType, pytypes.ModuleType, pytypes.FunctionType,
+        pytypes.BuiltinFunctionType, pytypes.MethodType)
+
+RESPONSE = '''<tns:lists xmlns:tns="%s">
+%s
+</tns:lists>'''
+ITEM = ('<tns:item><tns:id>%d</tns:id><tns:value>%d.5</tns:value><tns:ok>true</tns:ok></tns:item>'
+        '<tns:tag>tag%d</tns:tag>')
+
+def response(n):
+    '''A Lists response with n items and n tags'''
+    return RESPONSE % (TNS, '\n'.join(ITEM % (i, i, i % 50) for i in xrange(n)))
+
+def _category(obj):
+    if isinstance(obj, SchemaObject):
+        return 'SchemaObject:%s' % obj.__class__.__name__
+    if isinstance(obj, DynamicObject):
+        return 'DynamicObject'
+    if isinstance(obj, list):
+        return 'list'
+    if isinstance(obj, basestring):
+        return 'string'
+    if ET.iselement(obj):
+        return 'lxml'
+    return type(obj).__name__
+
+def _owned(obj):
+    '''
+    The containers that make up a DynamicObject's storage, which are
+    counted as part of the object.
+    '''
+    ret = []
+    d = getattr(obj, '__dict__', None)
+    if d is not None:
+        ret.append(d)
+        kl = d.get('__keylist__')
+        if isinstance(kl, KeyList):
+            ret.extend((kl, kl._index, kl._keys))
+    if isinstance(obj, CompactSchemaObject):
+        for name in CompactSchemaObject.__slots__:
+            value = getattr(obj, name, None)
+            if isinstance(value, (list, dict)):
+                ret.append(value)
+    return ret
+
+def footprint(root):
+    '''
+    Walk everything reachable from root and total the sizes
+    (sys.getsizeof) by category.  Shared objects are counted once.
+    Python 2 has no tracemalloc, so this counts objects rather than
+    tracing allocations.  lxml elements are counted, but their C
+    storage is only visible in the RSS.
+    '''
+    seen = set()
+    totals = {}
+    elements = set()
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP):
+            continue
+        seen.add(id(obj))
+        cat = _category(obj)
+        size = sys.getsizeof(obj)
+        refs = [obj]
+        if isinstance(obj, DynamicObject):
+            for part in _owned(obj):
+                if id(part) not in seen:
+                    seen.add(id(part))
+                    size += sys.getsizeof(part)
+                    refs.append(part)
+        elif cat == 'lxml':
+            # Count the whole tree the element belongs to
+            tree = obj.getroottree().getroot()
+            if id(tree) not in elements:
+                elements.add(id(tree))
+                entry = totals.setdefault('lxml elements', {'count': 0, 'bytes': None})
+                entry['count'] += memory.elements(tree)
+        entry = totals.setdefault(cat, {'count': 0, 'bytes': 0})
+        entry['count'] += 1
+        entry['bytes'] += size
+        for r in refs:
+            stack.extend(gc.get_referents(r))
+    total = sum(v['bytes'] for v in totals.values() if v['bytes'])
+    return {'total': total, 'by_kind': totals}
+
+def _builder(kind):
+    loader = SchemaLoader()
+    loader.urlcache = URLCache()
+    loader.load(ET.fromstring(schema()))
+    builder = Builder(loader, TNS, compact=(kind == 'compact'), lazy=(kind == 'lazy'))
+    if kind not in ('compact', 'lazy'):
+        # Don't share classes with the other scenarios
+        builder.cache = {}
+    return builder
+
+def run(kind, n):
+    '''
+    Deserialize a response of n items in one of the ways bubbles can,
+    and measure what the result keeps.
+    '''
+    text = response(n)
+    gc.collect()
+    rss0 = memory.rss()
+    elem = ET.fromstring(text)
+    rss1 = memory.rss()
+    builder = None
+    if kind == 'dynamic':
+        obj = DynamicObject(elem)
+    else:
+        builder = _builder(kind)
+        cls = builder.factory('{%s}Lists' % TNS)
+        if kind == 'pooled':
+            with using(StringPool()):
+                obj = cls(elem)
+        else:
+            obj = cls(elem)
+    del elem
+    gc.collect()
+    rss2 = memory.rss()
+    result = footprint(obj)
+    result.update({
+        'kind': kind,
+        'items': n,
+        'rss_tree': rss1 - rss0 if rss0 is not None else None,
+        'rss_retained': rss2 - rss0 if rss0 is not None else None,
+        'caches': caches(builder),
+    })
+    return result
+
+def _run(args):
+    return run(*args)
+
+def caches(builder=None):
+    '''
+    The sizes of the caches that live as long as the process: those of
+    the builder and its SchemaLoader (the global ones by default), the
+    converter memos and the default namespace resolver.
+    '''
+    if builder is None:
+        loader = SchemaLoader
+        cache = Builder.cache
+    else:
+        loader = builder.loader
+        cache = builder.cache
+    roots = [s['root'] for s in loader.schemas.values()]
+    memos = {}
+    for (typestr, conv) in types.converters.items():
+        memo = conv.__dict__.get('_memo')
+        if memo:
+            memos[typestr] = len(memo)
+    resolver = ns._default
+    return {
+        'Builder.cache': {'classes': len(cache), 'bytes': sys.getsizeof(cache)},
+        'SchemaLoader.schemas': {'namespaces': len(loader.schemas),
+            'elements': memory.elements(*roots)},
+        'SchemaLoader.urlcache': {'documents': len(loader.urlcache.roots),
+            'elements': memory.elements(*loader.urlcache.roots.values())},
+        'converter memos': memos,
+        'ns memos': {'expand': len(resolver._expand), 'split': len(resolver._split),
+            'qname': len(resolver._qname)},
+    }
+
+KINDS = ('schema', 'compact', 'lazy', 'pooled', 'dynamic')
+
+def usage(prog):
+    print """Usage: %s [-o filename] [-n items] [-k kinds]
+
+Deserialize large responses and report the memory they keep, and the size
+of the process-lifetime caches, as JSON.
+
+    -o <filename>: Write the results to filename (default stdout)
+    -n <items>: Items in the response (default 10000)
+    -k <kinds>: Comma separated ways to deserialize (default %s)
+""" % (prog, ','.join(KINDS))
+    return 1
+
+def main(argv):
+    opts = getopt(argv[1:], 'o:n:k:h?')
+    ofile = None
+    n = 10000
+    kinds = KINDS
+    for (opt, val) in opts[0]:
+        if opt == '-o':
+            ofile = val
+        elif opt == '-n':
+            n = int(val)
+        elif opt == '-k':
+            kinds = val.split(',')
+            for kind in kinds:
+                if kind not in KINDS:
+                    print "Unknown kind:", kind
+                    return usage(argv[0])
+        elif opt in ('-h', '-?'):
+            return usage(argv[0])
+        else:
+            print "Unknown option:", opt
+            return usage(argv[0])
+
+    # Each kind runs in a new process, so that the RSS figures aren't
+    # muddied by memory the previous one freed.
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        results = pool.map(_run, [(kind, n) for kind in kinds], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    report = {
+        'benchmark': 'memory',
+        'bubbles': __version__,
+        'python': platform.python_version(),
+        'lxml': ET.__version__,
+        'results': results,
+    }
+    if ofile:
+        ofile = file(ofile, 'w')
+    else:
+        ofile = sys.stdout
+    json.dump(report, ofile, indent=2, sort_keys=True)
+    print >>ofile
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
+
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Benchmarks for loading schemas, building types and constructing
+#    Clients, on synthetic schemas of controlled shapes and sizes.
+#    Results are written as JSON.
+#
+#    Run from the top of the source tree:
+#        PYTHONPATH=. python bubbles/misc/benchschema.py -o schema.json
+#
+#####################################################
+from bubbles import __version__
+from bubbles.xsd.schema import SchemaLoader, Builder
+from bubbles.soap.client import Client, WSDL
+from bubbles.util.urlcache import URLCache
+from bubbles.util import ns
+from bubbles.xmlimpl import ET
+from timeit import default_timer as timer
+from copy import copy
+from getopt import getopt
+import os
+import sys
+import json
+import shutil
+import tempfile
+import platform
+
+XSD = '''<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="%(tns)s" targetNamespace="%(tns)s" elementFormDefault="qualified">
+%(body)s
+</xs:schema>
+'''
+
+WSDL_DOC = '''<?xml version="1.0"?>
+<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="%(tns)s" targetNamespace="%(tns)s">
+  <wsdl:types>
+    <xs:schema targetNamespace="%(tns)s:wsdl">
+      <xs:import namespace="%(tns)s" schemaLocation="%(xsd)s"/>
+    </xs:schema>
+  </wsdl:types>
+  <wsdl:message name="RequestIn"><wsdl:part name="p" element="tns:Request"/></wsdl:message>
+  <wsdl:message name="ResponseOut"><wsdl:part name="p" element="tns:Response"/></wsdl:message>
+  <wsdl:portType name="BenchPort">
+    <wsdl:operation name="call"><wsdl:input message="tns:RequestIn"/><wsdl:output message="tns:ResponseOut"/></wsdl:operation>
+  </wsdl:portType>
+  <wsdl:binding name="BenchBinding" type="tns:BenchPort">
+    <wsdl:operation name="call"><soap:operation soapAction="call"/></wsdl:operation>
+  </wsdl:binding>
+  <wsdl:service name="Bench">
+    <wsdl:port name="BenchPort" binding="tns:BenchBinding"/>
+  </wsdl:service>
+</wsdl:definitions>
+'''
+
+# Field types used round-robin by the generators
+FIELDS = ('xs:string', 'xs:int', 'xs:boolean', 'xs:dateTime', 'xs:double')
+
+def _fields(prefix, n, start=0):
+    return '\n'.join('      <xs:element name="%s%d" type="%s" minOccurs="0"/>' %
+            (prefix, i, FIELDS[i % len(FIELDS)]) for i in range(start, start+n))
+
+def _type(name, fields, base=None):
+    if base:
+        return ('  <xs:complexType name="%s"><xs:complexContent><xs:extension base="tns:%s">\n'
+                '    <xs:sequence>\n%s\n    </xs:sequence>\n'
+                '  </xs:extension></xs:complexContent></xs:complexType>' % (name, base, fields))
+    return ('  <xs:complexType name="%s">\n    <xs:sequence>\n%s\n    </xs:sequence>\n'
+            '  </xs:complexType>' % (name, fields))
+
+def _messages(item):
+    # The request/response elements used by the benchmark WSDL
+    return ('  <xs:element name="Request"><xs:complexType><xs:sequence>\n'
+            '    <xs:element name="id" type="xs:int"/>\n'
+            '  </xs:sequence></xs:complexType></xs:element>\n'
+            '  <xs:element name="Response"><xs:complexType><xs:sequence>\n'
+            '    <xs:element name="item" type="tns:%s" minOccurs="0" maxOccurs="unbounded"/>\n'
+            '  </xs:sequence></xs:complexType></xs:element>' % item)
+
+# Each shape generator returns (body, {filename: body}, [typenames]).
+# The typenames are in an order where each type comes after its bases.
+
+def flat(n):
+    '''n independent complexTypes of 5 fields each'''
+    names = ['T%d' % i for i in range(n)]
+    body = [_type(name, _fields('f', 5)) for name in names]
+    return ('\n'.join(body), {}, names)
+
+def deep(n):
+    '''A chain of n complexTypes, each extending the one before'''
+    names = ['T%d' % i for i in range(n)]
+    body = [_type(names[0], _fields('f', 2))]
+    for i in range(1, n):
+        body.append(_type(names[i], _fields('f', 1, i+1), names[i-1]))
+    return ('\n'.join(body), {}, names)
+
+def wide(n):
+    '''One complexType with a sequence of n fields'''
+    return (_type('Wide', _fields('f', n)), {}, ['Wide'])
+
+def include(n):
+    '''n xs:included documents of 5 complexTypes each'''
+    body = []
+    files = {}
+    names = []
+    for i in range(n):
+        fname = 'inc%d.xsd' % i
+        body.append('  <xs:include schemaLocation="%s"/>' % fname)
+        inc = ['T%d_%d' % (i, j) for j in range(5)]
+        files[fname] = '\n'.join(_type(name, _fields('f', 5)) for name in inc)
+        names.extend(inc)
+    return ('\n'.join(body), files, names)
+
+def group(n):
+    '''n complexTypes each made of an xs:group ref and a global element ref'''
+    body = [_type('Leaf', _fields('l', 2))]
+    names = ['Leaf']
+    for i in range(n):
+        body.append('  <xs:group name="G%d"><xs:sequence>\n%s\n  </xs:sequence></xs:group>' %
+                (i, _fields('g', 3)))
+        body.append('  <xs:element name="E%d" type="tns:Leaf"/>' % i)
+        body.append('  <xs:complexType name="T%d"><xs:sequence>\n'
+                '    <xs:group ref="tns:G%d"/>\n'
+                '    <xs:element ref="tns:E%d" minOccurs="0"/>\n'
+                '  </xs:sequence></xs:complexType>' % (i, i, i))
+        names.append('T%d' % i)
+    return ('\n'.join(body), {}, names)
+
+SHAPES = { 'flat': flat, 'deep': deep, 'wide': wide, 'include': include, 'group': group }
+
+def generate(directory, shape, n, tns):
+    '''
+    Write the schema (and its includes and a WSDL using it) for a shape
+    into directory.  Returns (xsd url, wsdl url, typenames).
+    '''
+    (body, files, names) = SHAPES[shape](n)
+    body = body + '\n' + _messages(names[-1])
+    xsd = os.path.join(directory, 'bench.xsd')
+    for (fname, text) in [('bench.xsd', body)] + files.items():
+        with open(os.path.join(directory, fname), 'w') as f:
+            f.write(XSD % {'tns': tns, 'body': text})
+    wsdl = os.path.join(directory, 'bench.wsdl')
+    with open(wsdl, 'w') as f:
+        f.write(WSDL_DOC % {'tns': tns, 'xsd': 'bench.xsd'})
+    return ('file://' + xsd, 'file://' + wsdl, names)
+
+def _loader():
+    # A loader that doesn't share parsed documents with earlier runs
+    loader = SchemaLoader()
+    loader.urlcache = URLCache()
+    return loader
+
+def _summary(times):
+    if not times:
+        return None
+    return {
+        'min': min(times),
+        'mean': sum(times) / len(times),
+        'max': max(times),
+        'runs': times,
+    }
+
+def run(workdir, shape, n, repeat):
+    '''
+    Benchmark one shape and size.  Every run uses its own namespaces, so
+    that nothing is found in the Builder's class cache from earlier runs.
+    '''
+    times = { 'load': [], 'factory': [], 'client': [], 'client_warmup': [] }
+    errors = {}
+    ntypes = 0
+    for r in range(repeat):
+        for phase in ('factory', 'client', 'client_warmup'):
+            tns = 'urn:bench:%s:%d:%d:%s' % (shape, n, r, phase)
+            directory = os.path.join(workdir, '%s-%d-%d-%s' % (shape, n, r, phase))
+            os.mkdir(directory)
+            (xsd, wsdl, names) = generate(directory, shape, n, tns)
+            ntypes = len(names)
+            try:
+                if phase == 'factory':
+                    loader = _loader()
+                    start = timer()
+                    loader.load(xsd, pathinfo=xsd)
+                    times['load'].append(timer() - start)
+                    builder = Builder(loader, tns)
+                    start = timer()
+                    for name in names:
+                        builder.factory('{%s}%s' % (tns, name))
+                    times['factory'].append(timer() - start)
+                else:
+                    start = timer()
+                    Client(WSDL(wsdl, nsmap=copy(ns._defns), schemaloader=_loader()),
+                            url='http://localhost/', warmup=(phase == 'client_warmup'))
+                    times[phase].append(timer() - start)
+            except Exception as ex:
+                errors[phase] = repr(ex)
+    result = { 'shape': shape, 'size': n, 'types': ntypes }
+    for (k, v) in times.items():
+        result[k] = _summary(v)
+    if errors:
+        result['errors'] = errors
+    return result
+
+def usage(prog):
+    print """Usage: %s [-o filename] [-r repeat] [-s sizes] [-S shapes]
+
+Time schema loading, type building and Client construction on synthetic
+schemas, and write the results as JSON.
+
+    -o <filename>: Write the results to filename (default stdout)
+    -r <repeat>: Run each benchmark this many times (default 3)
+    -s <sizes>: Comma separated sizes (default 10,100,1000)
+    -S <shapes>: Comma separated shapes (default %s)
+""" % (prog, ','.join(sorted(SHAPES)))
+    return 1
+
+def main(argv):
+    opts = getopt(argv[1:], 'o:r:s:S:h?')
+    ofile = None
+    repeat = 3
+    sizes = [10, 100, 1000]
+    shapes = sorted(SHAPES)
+    for (opt, val) in opts[0]:
+        if opt == '-o':
+            ofile = val
+        elif opt == '-r':
+            repeat = int(val)
+        elif opt == '-s':
+            sizes = [int(x) for x in val.split(',')]
+        elif opt == '-S':
+            shapes = val.split(',')
+            for shape in shapes:
+                if shape not in SHAPES:
+                    print "Unknown shape:", shape
+                    return usage(argv[0])
+        elif opt in ('-h', '-?'):
+            return usage(argv[0])
+        else:
+            print "Unknown option:", opt
+            return usage(argv[0])
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix='benchschema')
+    try:
+        for shape in shapes:
+            for n in sizes:
+                print >>sys.stderr, "%s %d..." % (shape, n)
+                results.append(run(workdir, shape, n, repeat))
+    finally:
+        shutil.rmtree(workdir)
+
+    report = {
+        'benchmark': 'schema',
+        'bubbles': __version__,
+        'python': platform.python_version(),
+        'lxml': ET.__version__,
+        'repeat': repeat,
+        'results': results,
+    }
+    if ofile:
+        ofile = file(ofile, 'w')
+    else:
+        ofile = sys.stdout
+    json.dump(report, ofile, indent=2, sort_keys=True)
+    print >>ofile
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
+
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Benchmark of HTTPS requests with and without the connection cache
+#    of bubbles.soap.transport, against a local TLS stand-in server.
+#    Results are written as JSON.
+#
+#    Make a self-signed certificate and run from the top of the source tree:
+#        openssl req -x509 -newkey rsa:2048 -nodes -subj /CN=localhost \
+#            -keyout tls.pem -out tls.pem
+#        PYTHONPATH=. python bubbles/misc/benchtls.py -c tls.pem -o tls.json
+#
+#####################################################
+from bubbles import __version__
+from bubbles.soap.transport import Transport, ConnectionCache
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from timeit import default_timer as timer
+from getopt import getopt
+import threading
+import socket
+import urllib2
+import time
+import ssl
+import sys
+import json
+import platform
+
+ENVELOPE = '''<?xml version="1.0"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+<soapenv:Body><ping xmlns="urn:benchtls">%s</ping></soapenv:Body></soapenv:Envelope>'''
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send each response in one piece, or Nagle and delayed ACKs stall
+    # the next request on the connection
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = ENVELOPE % 'pong'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class Server(ThreadingMixIn, HTTPServer):
+    '''
+    A keep-alive HTTPS server that counts the TLS handshakes it does,
+    and can stand in for a slow embedded TLS stack by delaying each one.
+    '''
+    daemon_threads = True
+
+    def __init__(self, certfile, keyfile=None, delay=0.0):
+        HTTPServer.__init__(self, ('localhost', 0), Handler)
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(certfile, keyfile)
+        self.delay = delay
+        self.handshakes = 0
+
+    def get_request(self):
+        (sock, addr) = self.socket.accept()
+        if self.delay:
+            time.sleep(self.delay)
+        self.handshakes += 1
+        return (self.context.wrap_socket(sock, server_side=True), addr)
+
+    def handle_error(self, request, client_address):
+        # Clients closing idle connections aren't worth a traceback
+        if not isinstance(sys.exc_info()[1], (ssl.SSLError, socket.error)):
+            HTTPServer.handle_error(self, request, client_address)
+
+    def url(self):
+        return 'https://localhost:%d/soap' % self.server_address[1]
+
+def run(server, name, transport, n):
+    '''
+    Send n requests through transport and time them.
+    '''
+    url = server.url()
+    payload = ENVELOPE % 'ping'
+    handshakes = server.handshakes
+    times = []
+    for i in range(n):
+        req = urllib2.Request(url, payload, {'Content-Type': 'text/xml'})
+        start = timer()
+        rsp = transport.open(req, timeout=10)
+        rsp.read()
+        times.append(timer() - start)
+    times.sort()
+    return {
+        'name': name,
+        'requests': n,
+        'handshakes': server.handshakes - handshakes,
+        'total': sum(times),
+        'mean': sum(times) / n,
+        'median': times[n // 2],
+        'max': times[-1],
+    }
+
+def usage(prog):
+    print """Usage: %s -c certfile [-k keyfile] [-o filename] [-n count] [-d seconds]
+
+Time HTTPS requests to a local server with a new TLS handshake for each
+one (urllib2) and with the connection cache, and write the results as JSON.
+
+    -c <certfile>: The server's certificate (PEM), with its key unless -k
+    -k <keyfile>: The server's private key (PEM)
+    -o <filename>: Write the results to filename (default stdout)
+    -n <count>: Requests to send each way (default 200)
+    -d <seconds>: Delay each handshake, like a slow device (default 0)
+""" % prog
+    return 1
+
+def main(argv):
+    opts = getopt(argv[1:], 'c:k:o:n:d:h?')
+    certfile = None
+    keyfile = None
+    ofile = None
+    n = 200
+    delay = 0.0
+    for (opt, val) in opts[0]:
+        if opt == '-c':
+            certfile = val
+        elif opt == '-k':
+            keyfile = val
+        elif opt == '-o':
+            ofile = val
+        elif opt == '-n':
+            n = int(val)
+        elif opt == '-d':
+            delay = float(val)
+        elif opt in ('-h', '-?'):
+            return usage(argv[0])
+        else:
+            print "Unknown option:", opt
+            return usage(argv[0])
+    if certfile is None:
+        print "A certificate is required"
+        return usage(argv[0])
+
+    server = Server(certfile, keyfile, delay)
+    thread = threading.Thread(target=server.serve_forever, name='benchtls-server')
+    thread.daemon = True
+    thread.start()
+
+    # The client trusts the self-signed certificate
+    context = ssl.create_default_context(cafile=certfile)
+    results = []
+    print >>sys.stderr, "fresh..."
+    results.append(run(server, 'fresh', urllib2.build_opener(urllib2.HTTPSHandler(context=context)), n))
+    print >>sys.stderr, "cached..."
+    cache = ConnectionCache()
+    results.append(run(server, 'cached', Transport(cache, context), n))
+    results[-1]['stats'] = cache.stats()
+    cache.clear()
+    server.shutdown()
+
+    report = {
+        'benchmark': 'tls',
+        'bubbles': __version__,
+        'python': platform.python_version(),
+        'openssl': ssl.OPENSSL_VERSION,
+        'delay': delay,
+        'results': results,
+    }
+    if ofile:
+        ofile = file(ofile, 'w')
+    else:
+        ofile = sys.stdout
+    json.dump(report, ofile, indent=2, sort_keys=True)
+    print >>ofile
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
+
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -29,13 +29,22 @@
 #####################################################
 from bubbles.xmlimpl import ET, xmlstr
 from bubbles.util import ns
-from bubbles.xsd.schema import SchemaLoader, Builder
+from bubbles.xsd.schema import SchemaLoader, SchemaObject, Builder, Literal, xsi_type, ATTRIBUTE, PROPERTY, ANY, SIMPLE
+from bubbles.xsd.types import converter
 from bubbles.dobject import DynamicObject
+from bubbles.util.strpool import StringPool, using
+from bubbles.util import memory
 from copy import copy
+from itertools import count
+from StringIO import StringIO
 import urllib2 as urllib2
 from urlparse import urljoin
+from xml.sax.saxutils import escape
 from logging import getLogger
+import threading
+import gc
 import socket
+import uuid
 import re
 
 log = getLogger(__name__)
@@ -64,7 +73,7 @@ class SoapFault(DynamicObject, Exception):
                 self.message = node[0].text
             elif tag == 'detail' or tag == 'Detail':
                 faultobj = node[0]
-                type = faultobj.get(ET.QName(ns.XSI, 'type'))
+                type = faultobj.get(xsi_type)
                 if not type:
                     type = faultobj.tag
                 try:
@@ -89,11 +98,13 @@ class WSDL(object):
         self.schemaloader = schemaloader
 
         targetns = self._load(url)
-        self.builder = Builder(schemaloader, targetns)
+        self.builder = Builder(schemaloader, targetns,
+                compact=kwargs.get('compact', False),
+                lazy=kwargs.get('lazy', False))
         self.messages = self._messages()
 
     def _load(self, url):
-        doc = ET.parse(urllib2.urlopen(url))
+        doc = self.schemaloader.urlcache.parse(url).getroottree()
         extrans = doc.getroot().nsmap
         targetns = doc.getroot().get('targetNamespace')
         schemas = doc.findall(ns.expand('*/xs:schema'))
@@ -114,6 +125,18 @@ class WSDL(object):
 
         return targetns
 
+    def strip(self):
+        '''
+        Free the WSDL documents.  The message map is kept.
+
+        @rtype: int
+        @return: The number of XML elements freed
+        '''
+        freed = memory.elements(*self.documents)
+        self.documents = []
+        self.builder.strip()
+        return freed
+
     def find(self, path):
         ret = None
         for doc in self.documents:
@@ -138,12 +161,164 @@ class WSDL(object):
         return messages
                     
 
+# Placeholders are serialized, as Literals, as markers made of this token
+# and the placeholder name in hex.
+_token = uuid.uuid4().hex
+_marker = re.compile('@@%s:([0-9a-f]*)@@' % _token)
+_entities = { '"': '&quot;' }
+
+# Finds the xsi:type attributes, whose values use namespace prefixes
+_xsitypes = ET.XPath('//@xsi:type', namespaces={'xsi': ns.XSI})
+
+class _logged(object):
+    '''
+    Defers formatting a request for the debug log, hiding passwords.
+    '''
+    def __init__(self, payload, pretty):
+        self.payload = payload
+        self.pretty = pretty
+
+    def __str__(self):
+        payload = self.payload
+        if self.pretty:
+            payload = str(xmlstr(payload))
+        return re.sub(r'password>.*?<', r'password>*****<', payload)
+
+class Placeholder(Literal):
+    '''
+    A named hole in a L{RequestTemplate}.
+
+    Use placeholders in place of the values that change from request to
+    request.  The type of the placeholder is taken from the schema field
+    it is assigned to, unless given explicitly.
+    '''
+    def __new__(cls, name, type=None):
+        self = unicode.__new__(cls, u'@@%s:%s@@' % (_token, name.encode('hex')))
+        self.name = name
+        self.type = type
+        return self
+
+    def __repr__(self):
+        return 'Placeholder(%r)' % self.name
+
+def _convert(conv, value):
+    '''
+    Convert a string given for a field of another xs: type (e.g. a
+    dateTime) with the converter, as deserializing does.  Raises
+    ValueError if the string can't be converted.
+    '''
+    if not isinstance(value, basestring) or conv.check(value):
+        return value
+    try:
+        converted = conv.decode(value)
+    except (ValueError, KeyError):
+        converted = None
+    if converted is None:
+        raise ValueError("Can't convert %r with %s" % (value, conv.__name__))
+    return converted
+
+class RequestTemplate(object):
+    '''
+    A request for an operation that is serialized once, with
+    L{Placeholder}s for the values that change.
+
+    Calling the template substitutes the escaped values into the
+    serialized envelope and sends it, without building the request
+    objects or the XML tree again.  The client's SOAP headers are
+    captured when the template is created.
+
+    Example:
+
+        push = c.Metrics.putMetric.template(Placeholder('host'),
+                value=Placeholder('value'), unit='C')
+        push(host='bay1', value=42.0)
+    '''
+    def __init__(self, client, operation, args, kwargs):
+        self.client = client
+        self.operation = operation
+        param = client._message(operation, args, kwargs)
+        placeholders = self._bind(param, client.wsdl.builder)
+
+        payload = client.envelope(client.headers, param, operation.imsg)
+        payload = client._serialize(payload)
+        self.encoding = 'utf-8' if client.wire == 'compact' else 'ascii'
+        parts = _marker.split(payload)
+        self.parts = parts[0::2]
+        self.slots = []
+        for name in parts[1::2]:
+            p = placeholders[name.decode('hex')]
+            self.slots.append((p.name, converter(p.type or 'xs:string')))
+
+    def _bind(self, obj, builder):
+        '''
+        Find the placeholders in obj and give them the types of the
+        fields they are in.
+        '''
+        ret = {}
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, SchemaObject):
+                fields = [(t[0], t[1], t[4]) for t in obj.__template__ if t[0] in obj]
+            else:
+                fields = [(k, None, 0) for k in obj.__keylist__]
+            for (name, type, flags) in fields:
+                values = obj[name]
+                if not isinstance(values, (list, tuple)):
+                    values = [values]
+                for v in values:
+                    if isinstance(v, Placeholder):
+                        if v.type is None and type is not None:
+                            if flags & SIMPLE:
+                                type = builder.factory(type).__simple__
+                            v.type = type
+                        ret[v.name] = v
+                    elif isinstance(v, DynamicObject):
+                        stack.append(v)
+        return ret
+
+    def render(self, **values):
+        '''
+        Substitute values for the placeholders and return the request.
+        '''
+        parts = self.parts
+        ret = [parts[0]]
+        for (i, (name, conv)) in enumerate(self.slots):
+            try:
+                value = values[name]
+            except KeyError:
+                raise TypeError('No value for placeholder', name)
+            try:
+                value = _convert(conv, value)
+            except ValueError:
+                raise ValueError('Bad value for placeholder', name, value)
+            value = conv.tostr(value)
+            if value is None:
+                value = u''
+            elif isinstance(value, str):
+                value = value.decode('utf-8')
+            ret.append(escape(value, _entities).encode(self.encoding, 'xmlcharrefreplace'))
+            ret.append(parts[i+1])
+        return ''.join(ret)
+
+    def __call__(self, **values):
+        client = self.client
+        retxml = values.pop('__retxml__', client.retxml)
+        validate = values.pop('__validate__', client.validate)
+        timeout = values.pop('__timeout__', client.timeout)
+        transport_options = values.pop('__transport__', {})
+        client._reqno += 1
+        payload = self.render(**values)
+        rsp = client._send(self.operation, payload, timeout, transport_options)
+        return client._reply(self.operation, rsp, retxml, validate)
+
 class Operation(object):
     '''
     The Operation class represents a wsdl:operation.
     '''
     def __init__(self, client, btype, op, tns=None):
         self.name = op.get('name')
+        self.service = None
         portop = client.wsdl.find('wsdl:portType[@name="%s"]/wsdl:operation[@name="%s"]' % (btype, self.name))
         self.imsg = None
         self.ihdr = None
@@ -151,17 +326,18 @@ class Operation(object):
         self.client = client
         self.faults = []
         self.action = '""'
-        soapop = op.find(ns.expand('soap:operation', client.nsmap))
+        self._calls = count()
+        soapop = op.find(client.resolver.expand('soap:operation'))
         if soapop is not None:
             self.action = '"%s"' % soapop.get('soapAction', '')
 
-        hdr = op.find(ns.expand('soap:header', client.nsmap))
+        hdr = op.find(client.resolver.expand('soap:header'))
         if hdr is not None:
-            msg = client.wsdl.messages[ns.expand(hdr.get('message'), el.nsmap)]
+            msg = client.wsdl.messages[ns.expand(hdr.get('message'), hdr.nsmap)]
             self.ihdr = msg
 
         for el in portop:
-            (namespace, tag) = ns.split(el.tag)
+            (namespace, tag) = client.resolver.split(el.tag)
             if tag not in ('input', 'output', 'fault'):
                 continue
             msg = client.wsdl.messages[ns.expand(el.get('message'), el.nsmap)]
@@ -173,9 +349,22 @@ class Operation(object):
             if tag == 'fault':
                 self.faults.append(msg)
 
+    def sample(self, n):
+        '''
+        Count a call to this operation and return True for one call
+        in every n.
+        '''
+        return n <= 1 or next(self._calls) % n == 0
+
     def __call__(self, *args, **kwargs):
         return self.client.invoke(self, *args, **kwargs)
 
+    def iter(self, *args, **kwargs):
+        return self.client.iterinvoke(self, *args, **kwargs)
+
+    def template(self, *args, **kwargs):
+        return RequestTemplate(self.client, self, args, kwargs)
+
     def __str__(self):
         param = []
         icls = self.client._factory(self.imsg)
@@ -248,7 +437,9 @@ class Client(object):
         if isinstance(wsdl, WSDL):
             self.wsdl = wsdl
         else:
-            self.wsdl = WSDL(wsdl, nsmap=self.nsmap)
+            self.wsdl = WSDL(wsdl, nsmap=self.nsmap,
+                    compact=kwargs.get('compact', False),
+                    lazy=kwargs.get('lazy', False))
 
         self.url = url
         self.headers = []
@@ -256,13 +447,145 @@ class Client(object):
         self.retxml = kwargs.get('retxml', False)
         self.httphdr = kwargs.get('httphdr', {})
         self.transport = kwargs.get('transport', self.__transport__)
+        # How requests are serialized: 'pretty' (indented, declaring the
+        # whole nsmap) or 'compact' (UTF-8 on one line, declaring only
+        # the namespaces used).  Debug logs are indented either way.
+        self.wire = kwargs.get('wire', 'pretty')
+        if self.wire not in ('pretty', 'compact'):
+            raise ValueError('Unknown wire format', self.wire)
+        # Schema validation of responses.  validate is what to do on
+        # error ('raise', 'log' or 'pass'); validate_every=N validates
+        # one in every N responses of each operation.
+        self.validate = kwargs.get('validate', None)
+        self.validate_every = kwargs.get('validate_every', 1)
+        # String sharing while deserializing responses: None, 'response'
+        # (a new pool for each response) or 'client' (one pool for the
+        # life of the client).  strpool is the pool last used.
+        self.intern = kwargs.get('intern', None)
+        self.strpool = StringPool() if self.intern == 'client' else None
 
         self._reqno = 0
         self._inject = None
 
         self._update_nsmap()
+        # The resolver is a snapshot of nsmap.  Rebuild it if you change
+        # nsmap after construction.
+        self.resolver = ns.Resolver(self.nsmap)
         self._mk_service()
 
+        # Build the types ahead of time, in the background if asked.
+        warmup = kwargs.get('warmup', False)
+        if warmup == 'background':
+            self._warmup = threading.Thread(target=self.warmup, name='bubbles-warmup')
+            self._warmup.daemon = True
+            self._warmup.start()
+        elif warmup:
+            self.warmup()
+
+    def operations(self):
+        '''
+        Get all of the operations of all of the services.
+        '''
+        ops = []
+        for v in self.__dict__.values():
+            if isinstance(v, Service):
+                ops.extend(op for op in v.__dict__.values() if isinstance(op, Operation))
+        return ops
+
+    def warmup(self):
+        '''
+        Build the classobjects for every schema type and every operation's
+        messages now, rather than on first use.
+        '''
+        self.wsdl.builder.compile_all()
+        for op in self.operations():
+            for msg in [op.imsg, op.ihdr, op.omsg] + op.faults:
+                if msg is None:
+                    continue
+                try:
+                    self._factory(msg)
+                except Exception as ex:
+                    log.warning("Can't build %s: %s", msg, ex)
+
+    def strip(self, validators=None):
+        '''
+        Build every type and message now, then free the WSDL and schema
+        documents, keeping only what calling operations needs: the
+        classobjects, the message map and, if asked for, the schemas
+        for validation.
+
+        The schema documents belong to the client's SchemaLoader, which
+        is shared by all clients by default.  Only strip it when every
+        client using it has been created.
+
+        @type validators: bool
+        @param validators: Optional.  Keep the schemas for validating
+            responses.  Defaults to whether this client validates.
+        @rtype: dict
+        @return: The resident set size before and after (bytes, or None
+            if unknown) and the number of XML elements freed.
+        '''
+        if validators is None:
+            validators = bool(self.validate)
+        before = memory.rss()
+        warmup = getattr(self, '_warmup', None)
+        if warmup is not None:
+            warmup.join()
+        else:
+            self.warmup()
+        freed = self.wsdl.strip()
+        freed += self.wsdl.schemaloader.strip(validators)
+        gc.collect()
+        after = memory.rss()
+        log.info('Stripped %d XML elements, RSS %s -> %s', freed, before, after)
+        return { 'rss_before': before, 'rss_after': after, 'elements': freed }
+
+    def clone(self, url=None, **kwargs):
+        '''
+        Make a client for another endpoint that serves the same WSDL.
+
+        The clone shares this client's WSDL, builder, namespace map and
+        operation metadata, so none of them are loaded or built again.
+        It gets its own copies of the SOAP headers and HTTP headers.
+        Other settings are inherited unless given.
+
+        @type url: str
+        @param url: Optional.  The endpoint URL of the clone.
+        @param kwargs: Optional.  Settings for the clone, as for Client:
+            headers, httphdr, timeout, retxml, transport, wire,
+            validate, validate_every and intern.
+        @rtype: L{Client}
+        @return: The new client.
+        '''
+        client = copy(self)
+        client.url = url
+        client.headers = list(kwargs.pop('headers', self.headers))
+        client.httphdr = dict(kwargs.pop('httphdr', self.httphdr))
+        intern = kwargs.pop('intern', self.intern)
+        client.intern = intern
+        client.strpool = StringPool() if intern == 'client' else None
+        for (k, v) in kwargs.items():
+            if k not in ('timeout', 'retxml', 'transport', 'wire', 'validate', 'validate_every'):
+                raise TypeError('Unknown client setting', k)
+            setattr(client, k, v)
+        client._reqno = 0
+        client._inject = None
+
+        # Rebind copies of the operations to the clone.  They share the
+        # original's call counter, so validate_every samples across all
+        # of the clones rather than restarting for each one.
+        for (k, v) in self.__dict__.items():
+            if not isinstance(v, Service):
+                continue
+            service = Service(v.name)
+            for (name, op) in v.__dict__.items():
+                if isinstance(op, Operation):
+                    op = copy(op)
+                    op.client = client
+                setattr(service, name, op)
+            setattr(client, k, service)
+        return client
+
     def _update_nsmap(self):
         '''
         Update our namespace map with the namespaces provided by the WSDL.
@@ -295,7 +618,7 @@ class Client(object):
             name = s.get('name')
             service = Service(name)
             setattr(self, name, service)
-            port = s.find(ns.expand('wsdl:port', self.nsmap))
+            port = s.find(self.resolver.expand('wsdl:port'))
             (_, binding) = ns.split(port.get('binding'), port.nsmap)
             self._mk_binding(binding, service)
 
@@ -307,8 +630,9 @@ class Client(object):
         #print "making binding for",bname
         binding = self.wsdl.find('wsdl:binding[@name="%s"]' % bname)
         (_, btype) = ns.split(binding.get('type'), binding.nsmap)
-        for op in binding.findall(ns.expand('wsdl:operation', self.nsmap)):
+        for op in binding.findall(self.resolver.expand('wsdl:operation')):
             operation = Operation(self, btype, op)
+            operation.service = service.name
             setattr(service, op.get('name'), operation)
 
     def _factory(self, typename):
@@ -328,9 +652,9 @@ class Client(object):
         '''
         Build a SOAP envelope given headers and body.
         '''
-        env = ET.Element(ns.expand('soapenv:Envelope', self.nsmap), nsmap=self.nsmap)
-        envheader = ET.Element(ns.expand('soapenv:Header', self.nsmap))
-        envbody = ET.Element(ns.expand('soapenv:Body', self.nsmap))
+        env = ET.Element(self.resolver.expand('soapenv:Envelope'), nsmap=self.nsmap)
+        envheader = ET.Element(self.resolver.expand('soapenv:Header'))
+        envbody = ET.Element(self.resolver.expand('soapenv:Body'))
         env.append(envheader)
         env.append(envbody)
 
@@ -348,60 +672,110 @@ class Client(object):
                 else:
                     raise Exception('Cannot create SOAP:body')
             envbody.append(body)
+        if self.wire == 'compact':
+            # Drop the declarations nothing refers to
+            keep = set(v.split(':', 1)[0] for v in _xsitypes(env) if ':' in v)
+            ET.cleanup_namespaces(env, keep_ns_prefixes=keep)
         return env
 
-    def invoke(self, operation, *args, **kwargs):
+    def _serialize(self, env):
+        '''Serialize a SOAP envelope for the wire'''
+        if self.wire == 'compact':
+            return ET.tostring(env, encoding='UTF-8')
+        return ET.tostring(env, pretty_print=True)
+
+    def _message(self, operation, args, kwargs):
         '''
-        Invoke a SOAP operation.
+        Create an instance of the request message for a SOAP operation
+        and initialize it from the arguments.
         '''
-        self._reqno += 1
-        retxml = kwargs.pop('__retxml__', self.retxml)
-        timeout = kwargs.pop('__timeout__', self.timeout)
-        transport_options = kwargs.pop('__transport__', {})
-        # Create an instance of the request message and initialize
-        # the object from the arguments
         param = self.factory(operation.imsg)
         tmpl = param.__template__
         for k,v in zip((t[0] for t in tmpl), args):
             param[k] = v
         for k,v in kwargs.items():
             param[k] = v
+        return param
 
-        # Build the soap envelope and set the http headers
-        payload = self.envelope(self.headers, param, operation.imsg)
-        httphdr = { 'Content-Type': 'text/xml', 'SOAPAction': operation.action }
+    def _send(self, operation, payload, timeout, transport_options):
+        '''
+        Send a serialized request for a SOAP operation.
+
+        Returns a file-like object holding the response.
+        '''
+        compact = self.wire == 'compact'
+        ctype = 'text/xml; charset=utf-8' if compact else 'text/xml'
+        httphdr = { 'Content-Type': ctype, 'SOAPAction': operation.action }
         httphdr.update(self.httphdr)
 
-        # Construct and issue the request, read the response
-        payload = ET.tostring(payload, pretty_print=True)
-        log.debug('=== SOAP REQUEST ===\n%s', re.sub(r'password>.*?<', r'password>*****<', payload ))
+        log.debug('=== SOAP REQUEST ===\n%s', _logged(payload, compact))
         req = urllib2.Request(self.url, payload, httphdr)
         try:
             if self._inject:
-                xml = ET.fromstring(self._inject.next())
+                rsp = StringIO(self._inject.next())
+            elif hasattr(self.transport, 'open'):
+                rsp = self.transport.open(req, timeout=timeout, **transport_options)
             else:
-                if hasattr(self.transport, 'open'):
-                    rsp = self.transport.open(req, timeout=timeout, **transport_options)
-                else:
-                    rsp = self.transport.urlopen(req, timeout=timeout, **transport_options)
-                xml = ET.parse(rsp)
+                rsp = self.transport.urlopen(req, timeout=timeout, **transport_options)
         except urllib2.HTTPError as ex:
-            xml = ET.parse(ex)
+            rsp = ex
+        return rsp
+
+    def _request(self, operation, args, kwargs):
+        '''
+        Build and send the request for a SOAP operation.
+
+        Returns a file-like object holding the response.
+        '''
+        self._reqno += 1
+        timeout = kwargs.pop('__timeout__', self.timeout)
+        transport_options = kwargs.pop('__transport__', {})
+        param = self._message(operation, args, kwargs)
+
+        # Build the soap envelope, serialize and send it
+        payload = self.envelope(self.headers, param, operation.imsg)
+        payload = self._serialize(payload)
+        return self._send(operation, payload, timeout, transport_options)
+
+    def _pool(self):
+        '''Get the string pool for deserializing a response'''
+        if self.intern == 'response':
+            self.strpool = StringPool()
+        return self.strpool
+
+    def invoke(self, operation, *args, **kwargs):
+        '''
+        Invoke a SOAP operation.
+        '''
+        retxml = kwargs.pop('__retxml__', self.retxml)
+        validate = kwargs.pop('__validate__', self.validate)
+        rsp = self._request(operation, args, kwargs)
+        return self._reply(operation, rsp, retxml, validate)
+
+    def _reply(self, operation, rsp, retxml, validate):
+        '''
+        Parse and deserialize the response to a SOAP operation.
+        '''
+        xml = ET.parse(rsp)
 
         log.debug('=== SOAP RESPONSE ===\n%s', xmlstr(xml))
         # Get the soap body
-        retval = xml.find(ns.expand('soapenv:Body', self.nsmap))
+        retval = xml.find(self.resolver.expand('soapenv:Body'))
         if not retxml:
             # Does the body contain any nodes?
             if len(retval):
                 # Get the first child and examine it
                 retval = retval[0]
-                namespace, tag = ns.split(retval.tag)
+                namespace, tag = self.resolver.split(retval.tag)
                 # If it's a fault, convert it to an exception
                 if tag == 'Fault':
                     raise SoapFault(retval, self)
-                # Otherwise, deserialize
-                obj = self.factory(operation.omsg, retval)
+                # Otherwise, deserialize.  If we're validating, only
+                # validate the sampled responses.
+                if validate and not operation.sample(self.validate_every):
+                    validate = False
+                with using(self._pool()):
+                    obj = self.factory(operation.omsg, retval, __validate__=validate)
                 # If the deserialized
                 # object has only one item, return that item, otherwise the
                 # whole object
@@ -417,6 +791,69 @@ class Client(object):
 
         return retval
 
+    def iterinvoke(self, operation, *args, **kwargs):
+        '''
+        Invoke a SOAP operation whose response is a list, and yield the
+        items of the list one at a time as they are parsed.
+
+        The response is parsed incrementally and each item is dropped
+        from the XML tree once it has been deserialized, so neither the
+        whole document nor the whole list is held in memory.  Other
+        fields of the response are discarded and the response is not
+        validated or logged.
+
+        The request is not sent until the first item is asked for.
+
+        @param __field__: Optional.  The name of the list field, if the
+            output message has more than one.
+        '''
+        field = kwargs.pop('__field__', None)
+        kwargs.pop('__retxml__', None)
+        kwargs.pop('__validate__', None)
+
+        # Find the list field in the output message.  An empty instance
+        # of the message converts the items exactly like __fromxml__ would.
+        obj = self.factory(operation.omsg)
+        fields = [t for t in obj.__template__
+                if t[3] not in ((0, 1), (1, 1))
+                and not t[4] & (ATTRIBUTE | PROPERTY | ANY)
+                and (field is None or t[0] == field)]
+        if len(fields) != 1:
+            raise TypeError('Expecting exactly one list field', operation.omsg, field)
+        (name, type) = fields[0][:2]
+        if obj.__namespace__:
+            name = '{%s}%s' % (obj.__namespace__, name)
+
+        body = self.resolver.expand('soapenv:Body')
+        pool = self._pool()
+        rsp = self._request(operation, args, kwargs)
+        for (event, elem) in ET.iterparse(rsp):
+            # We only care about the children of the response element,
+            # which is the child of the soap body
+            parent = elem.getparent()
+            if parent is None:
+                continue
+            if parent.tag == body:
+                if self.resolver.split(elem.tag)[1] == 'Fault':
+                    raise SoapFault(elem, self)
+                continue
+            grandparent = parent.getparent()
+            if grandparent is None or grandparent.tag != body:
+                continue
+            if self.resolver.split(parent.tag)[1] == 'Fault':
+                # Keep the faultcode and faultstring for SoapFault
+                continue
+
+            if elem.tag == name:
+                with using(pool):
+                    item = obj._make_type(elem, type)
+                yield item
+            # Drop the children we've already handled.  The one that just
+            # ended stays until the next one ends, since the parser may
+            # still be referring to it.
+            while elem.getprevious() is not None:
+                del parent[0]
+
     def __str__(self):
         a = []
         a.append('Bubbles client')
@@ -0,0 +1,266 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Call one operation on many endpoints that share a WSDL
+#
+#####################################################
+from bubbles.soap.client import Operation
+from collections import namedtuple, deque
+from urlparse import urlsplit
+from Queue import Queue
+from logging import getLogger
+import threading
+import base64
+import time
+log = getLogger(__name__)
+
+class Result(namedtuple('Result', 'target url value error elapsed')):
+    '''
+    The outcome of calling an operation on one target.
+
+    value is what the operation returned and error is the exception
+    (e.g. a L{SoapFault}) it raised, if any.  elapsed is in seconds.
+    '''
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def _target(target):
+    if isinstance(target, basestring):
+        return (target, None)
+    return (tuple(target) + (None,))[:2]
+
+_ports = { 'http': 80, 'https': 443 }
+
+def _host(url):
+    # http://h1/x and http://h1:80/x are the same host
+    url = urlsplit(url)
+    return (url.hostname, url.port or _ports.get(url.scheme.lower()))
+
+class _Scheduler(object):
+    '''
+    Hand out targets to workers, round-robin by host, never letting
+    more than per_host of them work on the same host at once.
+    '''
+    def __init__(self, targets, per_host):
+        self.per_host = per_host
+        self.cond = threading.Condition()
+        self.waiting = {}
+        self.active = {}
+        self.ready = deque()
+        self.pending = 0
+        self.stopped = False
+        for target in targets:
+            host = _host(target[1])
+            queue = self.waiting.get(host)
+            if queue is None:
+                queue = self.waiting[host] = deque()
+                self.active[host] = 0
+                self.ready.append(host)
+            queue.append(target)
+            self.pending += 1
+
+    def take(self):
+        '''
+        Get the next target, waiting for a host to be free if need be.
+        Returns None when there are no more targets.
+        '''
+        with self.cond:
+            while True:
+                if self.stopped or not self.pending:
+                    return None
+                if self.ready:
+                    host = self.ready.popleft()
+                    queue = self.waiting[host]
+                    target = queue.popleft()
+                    self.pending -= 1
+                    if not self.pending:
+                        # Let the idle workers finish
+                        self.cond.notify_all()
+                    self.active[host] += 1
+                    if queue and self.active[host] < self.per_host:
+                        self.ready.append(host)
+                    return target
+                self.cond.wait()
+
+    def done(self, target):
+        with self.cond:
+            host = _host(target[1])
+            self.active[host] -= 1
+            # The host was held back only if it was at its limit
+            if self.waiting[host] and self.active[host] == self.per_host - 1:
+                self.ready.append(host)
+                self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+class Fleet(object):
+    '''
+    Fleet calls an operation on many endpoints that all serve the same
+    WSDL, such as a rack of identical devices.
+
+    The WSDL is loaded and its types are built once, by the client the
+    fleet is made from.  Each target gets a L{Client.clone} of it.
+
+    A target is a URL or a (url, credentials) tuple.  Credentials are
+    either a (username, password) tuple for HTTP basic authentication,
+    or a function that is given the target's client before the call,
+    e.g. to log in and add a WSSE header.
+
+    Example:
+
+        c = Client('hpoa.wsdl', compact=True)
+        fleet = Fleet(c, concurrency=64)
+        targets = [('https://%s/hpoa' % ip, ('admin', 'secret')) for ip in ips]
+        for result in fleet.run('getEnclosureStatus', targets):
+            if result.ok:
+                print result.url, result.value.operationalStatus
+            else:
+                print result.url, 'failed:', result.error
+    '''
+    def __init__(self, client, concurrency=32, per_host=1, **kwargs):
+        '''
+        Constructor for Fleet
+
+        @type client: L{Client}
+        @param client: The client to clone for each target.  Its types
+            are built now, if they haven't been already.
+        @type concurrency: int
+        @param concurrency: Optional.  The most calls in progress at once.
+        @type per_host: int
+        @param per_host: Optional.  The most calls in progress at once to
+            any one host (host:port).
+        @param kwargs: Optional.  Settings for the targets' clients, as
+            for L{Client.clone}.
+        '''
+        if concurrency < 1 or per_host < 1:
+            raise ValueError('Concurrency limits must be at least 1', concurrency, per_host)
+        self.client = client
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.options = kwargs
+        warmup = getattr(client, '_warmup', None)
+        if warmup is not None:
+            warmup.join()
+        else:
+            client.warmup()
+
+    def _operation(self, operation):
+        '''Find the operation, by name or as "service.operation"'''
+        if isinstance(operation, Operation):
+            return (operation.service, operation.name)
+        (service, _, name) = operation.rpartition('.')
+        for op in self.client.operations():
+            if op.name == name and (not service or op.service == service):
+                return (op.service, op.name)
+        raise AttributeError('No such operation', operation)
+
+    def connect(self, url, credentials=None):
+        '''
+        Make the client for one target.
+
+        @type url: str
+        @param url: The endpoint URL
+        @param credentials: Optional.  See L{Fleet}.
+        @rtype: L{Client}
+        @return: A clone of the fleet's client.
+        '''
+        client = self.client.clone(url, **self.options)
+        if callable(credentials):
+            credentials(client)
+        elif credentials is not None:
+            auth = base64.b64encode('%s:%s' % tuple(credentials))
+            client.httphdr['Authorization'] = 'Basic ' + auth
+        return client
+
+    def _call(self, target, operation, args, kwargs):
+        (service, name) = operation
+        (url, credentials) = target[1:3]
+        start = time.time()
+        value = error = None
+        try:
+            client = self.connect(url, credentials)
+            value = getattr(getattr(client, service), name)(*args, **kwargs)
+        except Exception as ex:
+            log.debug('%s.%s failed on %s: %s', service, name, url, ex)
+            error = ex
+        return Result(target[0], url, value, error, time.time() - start)
+
+    def _worker(self, scheduler, results, operation, args, kwargs):
+        while True:
+            target = scheduler.take()
+            if target is None:
+                break
+            try:
+                result = self._call(target, operation, args, kwargs)
+            finally:
+                scheduler.done(target)
+            results.put(result)
+
+    def run(self, operation, targets, *args, **kwargs):
+        '''
+        Call an operation on every target, and yield a L{Result} for
+        each one as soon as it is done.  Results come in the order the
+        calls finish.
+
+        If the caller stops iterating early, the targets that haven't
+        been started are skipped and the calls in progress are waited for.
+
+        @param operation: The operation's name (as "service.operation"
+            if more than one service has an operation by that name) or
+            the L{Operation} itself.
+        @param targets: URLs and/or (url, credentials) tuples.
+        @param args: The operation's arguments.
+        @param kwargs: The operation's keyword arguments, including
+            __timeout__, __retxml__ etc.
+        '''
+        operation = self._operation(operation)
+        targets = [(t,) + _target(t) for t in targets]
+        scheduler = _Scheduler(targets, self.per_host)
+        results = Queue()
+        workers = []
+        for i in range(min(self.concurrency, len(targets))):
+            w = threading.Thread(target=self._worker, name='bubbles-fleet-%d' % i,
+                    args=(scheduler, results, operation, args, kwargs))
+            w.daemon = True
+            w.start()
+            workers.append(w)
+        try:
+            for _ in range(len(targets)):
+                yield results.get()
+        finally:
+            scheduler.stop()
+            for w in workers:
+                w.join()
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -0,0 +1,320 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    HTTP(S) transport that keeps connections open between requests
+#
+#####################################################
+from StringIO import StringIO
+from urllib import splitport
+from logging import getLogger
+import urllib2
+import httplib
+import threading
+import socket
+import errno
+import ssl
+import time
+log = getLogger(__name__)
+
+_ports = { 'http': 80, 'https': 443 }
+
+# Errors sending on a connection the server has already closed
+_closed = (errno.ECONNRESET, errno.EPIPE)
+
+def _key(req, context):
+    # Connections made with different SSL contexts aren't interchangeable
+    scheme = req.get_type()
+    (host, port) = splitport(req.get_host())
+    port = int(port) if port else _ports[scheme]
+    return (scheme, host.lower(), port, context)
+
+def _eof(ex):
+    # The connection ended before any of the response arrived.  Over TLS
+    # with OpenSSL 3, that's an error rather than an empty status line
+    if isinstance(ex, httplib.BadStatusLine):
+        return True
+    return isinstance(ex, ssl.SSLError) and 'unexpected eof' in str(ex)
+
+class ConnectionCache(object):
+    '''
+    ConnectionCache keeps idle HTTP and HTTPS connections open, by
+    scheme, host, port and SSL context, so that the next request to
+    the same endpoint (from any client using the cache) skips the TCP
+    connect and, above all, the TLS handshake.
+
+    Python 2's ssl module can't resume TLS sessions, so rather than
+    caching sessions, the cache keeps the TLS connections themselves.
+    A connection the server has closed costs a full handshake.
+
+    The stats count the requests sent, the new connections made
+    (for https, full handshakes) and the requests that reused a
+    connection, in total and per host:port.
+    '''
+    def __init__(self, maxidle=4, idletime=60):
+        '''
+        Constructor for ConnectionCache
+
+        @type maxidle: int
+        @param maxidle: Optional.  The most idle connections kept for
+            any one endpoint.
+        @type idletime: float
+        @param idletime: Optional.  Seconds an idle connection is kept.
+            Keep this below the servers' keep-alive timeout.
+        '''
+        self.maxidle = maxidle
+        self.idletime = idletime
+        self.idle = {}
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''Zero the stats.'''
+        with self.lock:
+            self.counters = {}
+
+    def _count(self, key, name):
+        # Called with the lock held
+        hostport = '%s:%d' % key[1:3]
+        counters = self.counters.get(hostport)
+        if counters is None:
+            counters = self.counters[hostport] = {
+                    'requests': 0, 'connections': 0, 'reused': 0, 'retries': 0 }
+        counters[name] += 1
+
+    def count(self, key, name):
+        with self.lock:
+            self._count(key, name)
+
+    def get(self, key):
+        '''
+        Get an idle connection to an endpoint, or None if there isn't one.
+        '''
+        now = time.time()
+        with self.lock:
+            self._count(key, 'requests')
+            conns = self.idle.get(key)
+            while conns:
+                (conn, since) = conns.pop()
+                if now - since < self.idletime:
+                    return conn
+                conn.close()
+        return None
+
+    def put(self, key, conn):
+        '''
+        Keep a connection whose response has been read in full.
+        '''
+        with self.lock:
+            conns = self.idle.get(key)
+            if conns is None:
+                conns = self.idle[key] = []
+            if len(conns) < self.maxidle:
+                conns.append((conn, time.time()))
+                return
+        conn.close()
+
+    def clear(self):
+        '''Close all of the idle connections.'''
+        with self.lock:
+            idle = self.idle
+            self.idle = {}
+        for conns in idle.values():
+            for (conn, since) in conns:
+                conn.close()
+
+    def stats(self):
+        '''
+        Get the stats.
+
+        @rtype: dict
+        @return: The request, connection, reuse and retry counts and the
+            reuse rate, in total and for each host:port under 'hosts'.
+        '''
+        with self.lock:
+            hosts = dict((k, dict(v)) for (k, v) in self.counters.items())
+        total = { 'requests': 0, 'connections': 0, 'reused': 0, 'retries': 0 }
+        for counters in hosts.values():
+            for k in total:
+                total[k] += counters[k]
+            counters['reuse_rate'] = float(counters['reused']) / counters['requests']
+        total['reuse_rate'] = float(total['reused']) / total['requests'] if total['requests'] else 0.0
+        total['hosts'] = hosts
+        return total
+
+# The ConnectionCache used by default by all Transports
+connections = ConnectionCache()
+
+class _Response(object):
+    '''
+    A urllib2-like response that gives its connection back to the
+    cache once the body has been read.
+    '''
+    def __init__(self, cache, key, conn, rsp, url):
+        self.cache = cache
+        self.key = key
+        self.conn = conn
+        self.rsp = rsp
+        self.url = url
+        self.code = rsp.status
+        self.msg = rsp.reason
+        self.headers = rsp.msg
+
+    def _done(self):
+        conn = self.conn
+        if conn is None:
+            return
+        self.conn = None
+        if self.rsp.will_close:
+            conn.close()
+        else:
+            self.cache.put(self.key, conn)
+
+    def read(self, n=-1):
+        data = self.rsp.read() if n < 0 else self.rsp.read(n)
+        if self.rsp.isclosed():
+            self._done()
+        return data
+
+    def close(self):
+        if self.conn is not None and not self.rsp.isclosed():
+            # The rest of the body is still on the wire
+            self.conn.close()
+            self.conn = None
+        self.rsp.close()
+        self._done()
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.code
+
+    def geturl(self):
+        return self.url
+
+class Transport(object):
+    '''
+    Transport sends requests over persistent HTTP/1.1 connections kept
+    in a L{ConnectionCache}, for use as a Client's transport.
+
+    Proxies and redirects are not supported.
+
+    Example:
+
+        ctx = ssl.create_default_context(cafile='oa-ca.pem')
+        t = Transport(context=ctx)
+        c1 = Client('hpoa.wsdl', url='https://oa1/hpoa', transport=t)
+        c2 = Client('hpoa.wsdl', url='https://oa1/hpoa', transport=t)
+        ...
+        print t.cache.stats()['reuse_rate']
+    '''
+    def __init__(self, cache=None, context=None):
+        '''
+        Constructor for Transport
+
+        @type cache: L{ConnectionCache}
+        @param cache: Optional.  Where to keep idle connections.  Defaults
+            to the cache shared by all Transports.
+        @type context: L{ssl.SSLContext}
+        @param context: Optional.  The SSL context for https connections,
+            e.g. to trust a self-signed certificate.
+        '''
+        if cache is None:
+            cache = connections
+        self.cache = cache
+        self.context = context
+
+    def _connect(self, key, timeout):
+        (scheme, host, port, context) = key
+        if scheme == 'https':
+            return httplib.HTTPSConnection(host, port, timeout=timeout, context=context)
+        return httplib.HTTPConnection(host, port, timeout=timeout)
+
+    def open(self, req, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, context=None):
+        '''
+        Send a urllib2.Request and get the response.
+
+        Raises urllib2.HTTPError for error responses, like urllib2.urlopen.
+
+        A request on a reused connection is sent again on a new connection
+        only if the server turns out to have closed the old one: sending
+        fails with ECONNRESET or EPIPE, or the connection ends before any
+        of the response arrives.  Timeouts and other errors after the
+        request was sent are never retried.
+
+        @type context: L{ssl.SSLContext}
+        @param context: Optional.  The SSL context for this request,
+            instead of the transport's.  Pass it with __transport__:
+            c.hpoa.getBladeInfo(1, __transport__={'context': ctx})
+        '''
+        if context is None:
+            context = self.context
+        key = _key(req, context)
+        method = req.get_method()
+        headers = dict(req.unredirected_hdrs)
+        headers.update(req.headers)
+        conn = self.cache.get(key)
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = self._connect(key, timeout)
+            elif conn.sock is not None:
+                if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+                    conn.sock.settimeout(socket.getdefaulttimeout())
+                else:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, req.get_selector(), req.get_data(), headers)
+            except socket.error as ex:
+                stale = not isinstance(ex, socket.timeout) and ex.errno in _closed
+            else:
+                try:
+                    rsp = conn.getresponse()
+                    break
+                except (httplib.HTTPException, socket.error) as ex:
+                    stale = _eof(ex)
+            conn.close()
+            if not (reused and stale):
+                raise urllib2.URLError(ex)
+            # The server closed the idle connection; try a new one
+            log.debug('Reconnecting to %s:%d: %s', key[1], key[2], ex)
+            self.cache.count(key, 'retries')
+            conn = None
+            reused = False
+        self.cache.count(key, 'reused' if reused else 'connections')
+
+        rsp = _Response(self.cache, key, conn, rsp, req.get_full_url())
+        if rsp.code >= 400:
+            body = rsp.read()
+            raise urllib2.HTTPError(rsp.url, rsp.code, rsp.msg, rsp.headers, StringIO(body))
+        return rsp
+
+    def urlopen(self, req, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, context=None):
+        return self.open(req, timeout, context)
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
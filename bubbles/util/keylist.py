@@ -0,0 +1,119 @@
+#####################################################
+#
+# keylist.py
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    An ordered, hash-indexed list of keys
+#
+#####################################################
+
+# Marks the slot of a removed key until the list is compacted
+_HOLE = object()
+
+class KeyList(object):
+    '''
+    KeyList is an insertion-ordered set of keys that also behaves enough
+    like a list to be used as DynamicObject.__keylist__.
+
+    Membership tests, append and remove are O(1).  Removed keys leave a
+    hole behind which is squeezed out the next time the list is indexed
+    or when the holes outnumber the keys.
+
+        k = KeyList(['a', 'b'])
+        k.append('c')
+        'b' in k  -> True
+        k[0]      -> 'a'
+        k[:]      -> ['a', 'b', 'c']
+    '''
+    __slots__ = ('_index', '_keys', '_holes')
+
+    def __init__(self, keys=()):
+        self._index = {}
+        self._keys = []
+        self._holes = 0
+        for k in keys:
+            self.append(k)
+
+    def _compact(self):
+        # Build a new list rather than editing in place so that iterators
+        # over the old list aren't disturbed.
+        keys = [k for k in self._keys if k is not _HOLE]
+        self._index = dict((k, i) for i, k in enumerate(keys))
+        self._keys = keys
+        self._holes = 0
+
+    def append(self, key):
+        '''Add key to the end of the list if it isn't already present'''
+        if key not in self._index:
+            self._index[key] = len(self._keys)
+            self._keys.append(key)
+
+    def remove(self, key):
+        '''Remove key.  Raises ValueError if key is not present'''
+        try:
+            pos = self._index.pop(key)
+        except KeyError:
+            raise ValueError('KeyList.remove(x): x not in list')
+        self._keys[pos] = _HOLE
+        self._holes += 1
+        if self._holes > len(self._index):
+            self._compact()
+
+    def index(self, key):
+        '''Get the position of key'''
+        if self._holes:
+            self._compact()
+        try:
+            return self._index[key]
+        except KeyError:
+            raise ValueError('%r is not in list' % (key,))
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        # Keys may be removed while iterating, so skip holes even if
+        # there are none yet
+        return (k for k in self._keys if k is not _HOLE)
+
+    def __getitem__(self, i):
+        if self._holes:
+            self._compact()
+        return self._keys[i]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'KeyList(%r)' % list(self)
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
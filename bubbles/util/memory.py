@@ -0,0 +1,60 @@
+#####################################################
+#
+# memory.py
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Process memory measurements
+#
+#####################################################
+import os
+
+def rss():
+    '''
+    Get the resident set size of this process in bytes, or None if the
+    platform doesn't say.
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+def elements(*roots):
+    '''
+    Count the XML elements (and comments) in the trees under roots.
+    '''
+    count = 0
+    for root in roots:
+        if root is None:
+            continue
+        if hasattr(root, 'getroot'):
+            root = root.getroot()
+        for el in root.iter():
+            count += 1
+    return count
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
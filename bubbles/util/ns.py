@@ -28,7 +28,7 @@
 #    XML namespace utility functions
 #
 #####################################################
-
+from bubbles.xmlimpl import ET
 
 XS = 'http://www.w3.org/2001/XMLSchema'
 XSI = 'http://www.w3.org/2001/XMLSchema-instance'
@@ -55,6 +55,18 @@ _defns = {
 class UnknownNamespace(Exception):
     pass
 
+def _lookup(key, nsmap, kwargs):
+    '''
+    Look up key in nsmap, falling back to kwargs.
+
+    Entries in nsmap take precedence over the extra namespaces in kwargs.
+    Raises KeyError if key is in neither.
+    '''
+    try:
+        return nsmap[key]
+    except KeyError:
+        return kwargs[key]
+
 def expand(s, nsmap={}, **kwargs):
     '''
     Expand a string with a namespace.
@@ -75,10 +87,18 @@ def expand(s, nsmap={}, **kwargs):
 
     Note: This function won't work for XPath like strings with attributes that may be
     in a namespace:  //foo:bar[@name="bleep:bloop"].  Sorry.
+
+    If you expand many strings against the same namespaces, use a
+    L{Resolver} instead.
     '''
     if '}' in s:
         return s
 
+    if not nsmap:
+        if not kwargs:
+            return _default.expand(s)
+        nsmap = _defns
+
     if '/' in s:
         ret = []
         for segment in s.split('/'):
@@ -87,23 +107,21 @@ def expand(s, nsmap={}, **kwargs):
             ret.append(segment)
         return '/'.join(ret)
 
-    if not nsmap:
-        nsmap=_defns
-    kwargs.update(nsmap)
     if ':' in s:
         (ns, val) = s.split(':')
         try:
-            ns = kwargs[ns]
+            ns = _lookup(ns, nsmap, kwargs)
         except KeyError:
             raise UnknownNamespace(ns)
     else:
         val = s
-        if 'targetNamespace' in kwargs:
-            ns = kwargs['targetNamespace']
-        elif None in kwargs:
-            ns = kwargs[None]
-        else:
-            raise UnknownNamespace('No target namespace')
+        try:
+            ns = _lookup('targetNamespace', nsmap, kwargs)
+        except KeyError:
+            try:
+                ns = _lookup(None, nsmap, kwargs)
+            except KeyError:
+                raise UnknownNamespace('No target namespace')
 
     return '{%s}%s' % (ns, val)
 
@@ -120,27 +138,119 @@ def split(s, nsmap={}, **kwargs):
 
     This does the inverse of expand.  Returns a 2-tuple of namespace-URI and tag.
     '''
+    if not nsmap:
+        if not kwargs:
+            return _default.split(s)
+        nsmap = _defns
+
     if '}' in s:
         (ns, tag) = s.split('}')
         ns = ns[1:]
         return (ns, tag)
 
-    if not nsmap:
-        nsmap = _defns
-    kwargs.update(nsmap)
     if ':' in s:
         (ns, tag) = s.split(':')
         try:
-            ns = kwargs[ns]
+            ns = _lookup(ns, nsmap, kwargs)
         except KeyError:
             raise UnknownNamespace(ns)
     else:
         tag = s
-        ns = kwargs.get('targetNamespace')
+        ns = nsmap.get('targetNamespace', kwargs.get('targetNamespace'))
         if ns is None:
-            ns = kwargs.get(None)
+            ns = nsmap.get(None, kwargs.get(None))
     return (ns, tag)
 
 
+class Resolver(object):
+    '''
+    A Resolver expands and splits strings against a fixed set of namespaces
+    and remembers the answers.
+
+    The namespaces are copied when the Resolver is constructed, so changes
+    to the original dictionary are not seen by the Resolver.  Build a new
+    Resolver if the namespaces change.
+
+    Example:
+
+        r = Resolver(client.nsmap)
+        r.expand('soapenv:Body')  -> '{http://schemas...envelope/}Body'
+        r.split('{urn:foo}bar')   -> ('urn:foo', 'bar')
+        r.qname('xsi:type')       -> QName('{http://www.w3...instance}type')
+    '''
+    # Drop the memo tables when they grow past this many entries so that
+    # strings from documents (rather than from schemas) can't grow them
+    # without bound.
+    maxsize = 4096
+
+    def __init__(self, nsmap=None, **kwargs):
+        '''
+        Constructor for Resolver
+
+        @type nsmap: dict
+        @param nsmap: Optional. Dictionary of prefixes and namespaces.
+        @param kwargs: Extra namespaces (e.g. targetNamespace).
+        '''
+        # Merge the same way expand does: nsmap entries win over kwargs
+        merged = dict(kwargs)
+        merged.update(nsmap or _defns)
+        self._nsmap = merged
+        self._expand = {}
+        self._split = {}
+        self._qname = {}
+
+    def get(self, prefix, default=None):
+        '''Get the namespace URI bound to prefix'''
+        return self._nsmap.get(prefix, default)
+
+    def expand(self, s):
+        '''
+        Expand a string with a namespace.  See L{expand}.
+        '''
+        try:
+            return self._expand[s]
+        except KeyError:
+            pass
+        ret = expand(s, self._nsmap)
+        if len(self._expand) >= self.maxsize:
+            self._expand.clear()
+        self._expand[s] = ret
+        return ret
+
+    def split(self, s):
+        '''
+        Split a string with a namespace.  See L{split}.
+        '''
+        try:
+            return self._split[s]
+        except KeyError:
+            pass
+        ret = split(s, self._nsmap)
+        if len(self._split) >= self.maxsize:
+            self._split.clear()
+        self._split[s] = ret
+        return ret
+
+    def qname(self, s):
+        '''
+        Get a shared QName object for the expanded form of s.
+
+        @rtype: L{ElementTree.QName}
+        '''
+        try:
+            return self._qname[s]
+        except KeyError:
+            pass
+        ret = ET.QName(self.expand(s))
+        if len(self._qname) >= self.maxsize:
+            self._qname.clear()
+        self._qname[s] = ret
+        return ret
+
+# Resolver for the default namespaces.  expand and split use this when
+# called without any namespaces.
+_default = Resolver(_defns)
+
+
 # VIM options (place at end of file)
 # vim: ts=4 sts=4 sw=4 expandtab:
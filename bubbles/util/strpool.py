@@ -0,0 +1,129 @@
+#####################################################
+#
+# strpool.py
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Share equal strings between deserialized objects
+#
+#####################################################
+from contextlib import contextmanager
+import threading
+import sys
+
+_local = threading.local()
+
+class StringPool(object):
+    '''
+    A StringPool hands out one shared copy of each distinct string.
+
+    Responses tend to repeat the same field names, status strings,
+    enumeration values and model names over and over.  While a pool is
+    active (see L{using}), deserialization passes those strings through
+    the pool so that equal strings become the same object.
+
+        pool = StringPool()
+        with using(pool):
+            obj = client.factory('Foo', xml)
+        pool.stats()  -> {'strings': 12, 'lookups': 30000, 'hits': 29988, ...}
+    '''
+    def __init__(self, maxsize=65536):
+        '''
+        Constructor for StringPool
+
+        @type maxsize: int
+        @param maxsize: Optional.  Stop adding new strings once the pool
+            holds this many.
+        '''
+        self.maxsize = maxsize
+        # One table per string type, so a str never comes back as unicode
+        self.tables = {str: {}, unicode: {}}
+        self.size = 0
+        self.lookups = 0
+        self.hits = 0
+        self.saved = 0
+
+    def __call__(self, s):
+        '''
+        Get the shared copy of s.  Values that aren't strings are
+        returned unchanged.
+        '''
+        table = self.tables.get(type(s))
+        if table is None:
+            return s
+        self.lookups += 1
+        ret = table.get(s)
+        if ret is not None:
+            self.hits += 1
+            self.saved += sys.getsizeof(s)
+            return ret
+        if self.size < self.maxsize:
+            table[s] = s
+            self.size += 1
+        return s
+
+    def stats(self):
+        '''
+        Get statistics about the pool.
+
+        'saved' is the number of bytes taken by the duplicate strings
+        that were replaced by shared copies.
+        '''
+        return {
+            'strings': self.size,
+            'bytes': sum(sys.getsizeof(s) for t in self.tables.values() for s in t),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'saved': self.saved,
+        }
+
+    def clear(self):
+        for table in self.tables.values():
+            table.clear()
+        self.size = 0
+
+def current():
+    '''
+    Get the pool that is active in this thread, or None.
+    '''
+    return getattr(_local, 'pool', None)
+
+@contextmanager
+def using(pool):
+    '''
+    Make pool the active pool in this thread for the duration of a
+    with statement.  A pool of None does nothing.
+    '''
+    if pool is None:
+        yield None
+        return
+    prev = current()
+    _local.pool = pool
+    try:
+        yield pool
+    finally:
+        _local.pool = prev
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -0,0 +1,212 @@
+#####################################################
+#
+# urlcache.py
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#    Fetch, cache and parse XML documents by URL
+#
+#####################################################
+from bubbles.xmlimpl import ET
+from copy import deepcopy
+import urllib2
+import threading
+import hashlib
+import socket
+import json
+import time
+import os
+import re
+from logging import getLogger
+log = getLogger(__name__)
+
+class CacheMiss(Exception):
+    pass
+
+_maxage = re.compile(r'max-age\s*=\s*(\d+)')
+
+class URLCache(object):
+    '''
+    URLCache fetches and parses the XML documents (WSDLs and schemas)
+    that bubbles loads by URL.
+
+    Parsed documents are remembered by URL for the life of the process.
+    Every caller gets its own copy of the document, since the loaders
+    modify the documents they are given.
+
+    If cachedir is set, documents fetched over http(s) are also kept on
+    disk.  A cached copy is used without asking the server while it is
+    younger than its max-age (from the server's Cache-Control header, or
+    the maxage attribute if the server doesn't say).  After that, the
+    server is asked whether the document has changed (using its ETag or
+    Last-Modified header).  If the server can't be reached, the cached
+    copy is used anyway.
+
+    In offline mode, nothing is fetched over the network: documents
+    come from the disk cache or not at all.
+
+    Example:
+
+        SchemaLoader.urlcache.cachedir = '/var/cache/bubbles'
+        SchemaLoader.urlcache.maxage = 3600
+        c = Client('https://oa/hpoa.wsdl', url='https://oa/hpoa')
+    '''
+    def __init__(self, cachedir=None, maxage=0, offline=False):
+        '''
+        Constructor for URLCache
+
+        @type cachedir: str
+        @param cachedir: Optional.  Directory for cached documents.
+        @type maxage: int
+        @param maxage: Optional.  Seconds a cached document is used without
+            revalidation, if the server doesn't say.
+        @type offline: bool
+        @param offline: Optional.  Never fetch documents over the network.
+        '''
+        self.cachedir = cachedir
+        self.maxage = maxage
+        self.offline = offline
+        self.roots = {}
+        self.lock = threading.Lock()
+
+    def _remote(self, url):
+        return url.split(':', 1)[0].lower() in ('http', 'https')
+
+    def _paths(self, url):
+        key = hashlib.sha1(url).hexdigest()
+        base = os.path.join(self.cachedir, key)
+        return (base + '.xml', base + '.json')
+
+    def _read(self, url):
+        (data, meta) = self._paths(url)
+        try:
+            with open(meta) as f:
+                meta = json.load(f)
+            with open(data, 'rb') as f:
+                data = f.read()
+        except (IOError, ValueError):
+            return (None, {})
+        return (data, meta)
+
+    def _write(self, url, data, meta):
+        if not os.path.isdir(self.cachedir):
+            os.makedirs(self.cachedir)
+        # Write to temporary files and rename them into place so that
+        # other processes never see a partial document.
+        for (path, content) in zip(self._paths(url), (data, json.dumps(meta))):
+            tmp = '%s.%d' % (path, os.getpid())
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.rename(tmp, path)
+
+    def fetch(self, url):
+        '''
+        Get the content of a URL.
+
+        @type url: str
+        @param url: The URL to fetch
+        @rtype: str
+        @return: The content of the document
+        '''
+        remote = self._remote(url)
+        if not (remote and self.cachedir):
+            if remote and self.offline:
+                raise CacheMiss(url)
+            return urllib2.urlopen(url).read()
+
+        (data, meta) = self._read(url)
+        if data is not None:
+            age = time.time() - meta.get('fetched', 0)
+            if self.offline or age < meta.get('maxage', self.maxage):
+                return data
+        if self.offline:
+            raise CacheMiss(url)
+
+        req = urllib2.Request(url)
+        if data is not None:
+            if meta.get('etag'):
+                req.add_header('If-None-Match', meta['etag'])
+            if meta.get('modified'):
+                req.add_header('If-Modified-Since', meta['modified'])
+        try:
+            rsp = urllib2.urlopen(req)
+            content = rsp.read()
+        except urllib2.HTTPError as ex:
+            if ex.code == 304 and data is not None:
+                log.debug('Cached copy of %s is still good', url)
+                meta['fetched'] = time.time()
+                self._write(url, data, meta)
+                return data
+            if data is None:
+                raise
+            log.warning('Using cached copy of %s: %s', url, ex)
+            return data
+        except (urllib2.URLError, socket.error, IOError) as ex:
+            if data is None:
+                raise
+            log.warning('Using cached copy of %s: %s', url, ex)
+            return data
+
+        headers = rsp.info()
+        meta = {
+            'url': url,
+            'fetched': time.time(),
+            'etag': headers.get('ETag'),
+            'modified': headers.get('Last-Modified'),
+        }
+        match = _maxage.search(headers.get('Cache-Control', ''))
+        if match:
+            meta['maxage'] = int(match.group(1))
+        self._write(url, content, meta)
+        return content
+
+    def parse(self, url):
+        '''
+        Get a copy of the root element of the XML document at a URL.
+
+        @type url: str
+        @param url: The URL of the document
+        @rtype: L{ElementTree.Element}
+        @return: The root element.  The caller is free to modify it.
+        '''
+        with self.lock:
+            root = self.roots.get(url)
+        if root is None:
+            root = ET.fromstring(self.fetch(url), base_url=url)
+            with self.lock:
+                self.roots[url] = root
+        return deepcopy(root)
+
+    def clear(self):
+        '''
+        Forget the documents parsed so far.  The disk cache is kept.
+        '''
+        with self.lock:
+            self.roots.clear()
+
+# The URLCache used by default by all SchemaLoaders
+urlcache = URLCache()
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
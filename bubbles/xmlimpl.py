@@ -44,11 +44,19 @@ class xmlstr:
 
         xml = ET.parse(...)
         log.debug("The xml was: %s", xmlstr(xml))
+
+    xml may also be a serialized document, which is re-indented.
     '''
     def __init__(self, xml):
         self.xml = xml
     def __str__(self):
-        return ET.tostring(self.xml, pretty_print=True)
+        xml = self.xml
+        if isinstance(xml, basestring):
+            try:
+                xml = ET.fromstring(xml, ET.XMLParser(remove_blank_text=True))
+            except ET.XMLSyntaxError:
+                return xml
+        return ET.tostring(xml, pretty_print=True)
 
 __all__ = [ 'ET', 'xmlstr']
 
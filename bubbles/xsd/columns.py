@@ -0,0 +1,235 @@
+#####################################################
+#
+# copyright.txt
+#
+# Copyright 2012 Hewlett-Packard Development Company, L.P.
+#
+# Hewlett-Packard and the Hewlett-Packard logo are trademarks of
+# Hewlett-Packard Development Company, L.P. in the U.S. and/or other countries.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Author:
+#    Chris Frantz
+# 
+# Description:
+#     Export lists of SchemaObjects (or their XML) as columns
+#
+#####################################################
+from bubbles.xsd.schema import ATTRIBUTE, PROPERTY, ANY, QUALIFIED, xsi_nil
+from bubbles.xsd.types import converter
+from bubbles.util.ordered_dict import OrderedDict
+from collections import namedtuple
+
+# NumPy is only needed for the structured array exporters
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# NumPy dtypes for the xs:types.  Everything else is stored as objects.
+dtypes = {
+        'xs:boolean': '?',
+        'xs:integer': 'i8',
+        'xs:byte': 'i1',
+        'xs:short': 'i2',
+        'xs:int': 'i4',
+        'xs:long': 'i8',
+        'xs:unsignedByte': 'u1',
+        'xs:unsignedShort': 'u2',
+        'xs:unsignedInt': 'u4',
+        'xs:unsignedLong': 'u8',
+        'xs:decimal': 'f8',
+        'xs:float': 'f4',
+        'xs:double': 'f8',
+        'xs:dateTime': 'M8[us]',
+        'xs:date': 'M8[D]',
+}
+
+# A column of an export.
+#   name -- column name.  Fields of nested objects are joined with '.'
+#   path -- field names to follow from the object to the value
+#   xpath -- (kind, name) steps to follow from the XML element to the value
+#   type -- the xs:type of the value
+#   dtype -- the NumPy dtype of the column
+Column = namedtuple('Column', 'name path xpath type dtype')
+
+def _qualify(namespace, name, expand=True):
+    # Same as DynamicObject.__nsx__, but for a class
+    if expand and namespace:
+        return '{%s}%s' % (namespace, name)
+    return name
+
+def schema(cls, _path=(), _xpath=(), _seen=()):
+    '''
+    Derive the columns for a SchemaObject class from its template.
+
+    Every single-valued field with a primitive type becomes a column.
+    Single-valued fields with a complexType are flattened into columns
+    named parent.child.  Lists and xs:any fields are skipped.
+
+    @type cls: class
+    @param cls: A class built by a Builder
+    @rtype: list
+    @return: A list of L{Column}s
+    '''
+    columns = []
+    lat = len(cls.__attrchar__)
+    _seen = _seen + (cls,)
+    for (name, type, default, minmax, flags) in cls.__template__:
+        if (flags & ANY) or minmax not in ((0, 1), (1, 1)):
+            continue
+        if flags & ATTRIBUTE:
+            step = ('attribute', _qualify(cls.__namespace__, name[lat:], flags & QUALIFIED))
+        elif flags & PROPERTY:
+            step = ('text', None)
+        else:
+            step = ('child', _qualify(cls.__namespace__, name))
+        path = _path + (name,)
+        xpath = _xpath + (step,)
+
+        if not type.startswith('xs:'):
+            sub = cls.__builder__.factory(type)
+            if not sub.__simple__:
+                # Flatten nested objects, but don't chase recursive types
+                if sub not in _seen:
+                    columns.extend(schema(sub, path, xpath, _seen))
+                continue
+            type = sub.__simple__
+        columns.append(Column('.'.join(path), path, xpath, type, dtypes.get(type, 'O')))
+    return columns
+
+def tocolumns(objs, columns=None):
+    '''
+    Convert a list of SchemaObjects into columns.
+
+    @type objs: list
+    @param objs: The objects, all of the same class
+    @type columns: list
+    @param columns: Optional.  The columns to export.  Defaults to
+        schema() of the class of the first object.
+    @rtype: L{OrderedDict}
+    @return: Column name to list of values.  Missing values are None.
+    '''
+    if columns is None:
+        columns = schema(type(objs[0])) if len(objs) else []
+    ret = OrderedDict()
+    for col in columns:
+        values = []
+        for obj in objs:
+            for name in col.path:
+                obj = getattr(obj, name, None)
+                if obj is None:
+                    break
+            values.append(obj)
+        ret[col.name] = values
+    return ret
+
+def xmlcolumns(elems, cls, columns=None):
+    '''
+    Convert a list of XML elements straight into columns, without
+    building SchemaObjects.
+
+    @type elems: list
+    @param elems: The XML elements, all of which represent cls
+    @type cls: class
+    @param cls: The class built by a Builder for the elements
+    @type columns: list
+    @param columns: Optional.  The columns to export.  Defaults to
+        schema(cls).
+    @rtype: L{OrderedDict}
+    @return: Column name to list of values.  Missing values are None.
+        Raises ValueError, naming the column and row, for a value that
+        can't be converted to the column's type.
+    '''
+    if columns is None:
+        columns = schema(cls)
+    ret = OrderedDict()
+    for col in columns:
+        decode = converter(col.type).decode
+        values = []
+        for (row, elem) in enumerate(elems):
+            value = elem
+            for (kind, name) in col.xpath:
+                if kind == 'child':
+                    value = value.find(name)
+                    if value is not None and value.get(xsi_nil) == 'true':
+                        value = None
+                elif kind == 'attribute':
+                    value = value.get(name)
+                else:
+                    value = value.text
+                if value is None:
+                    break
+            if value is not None:
+                if not isinstance(value, basestring):
+                    value = value.text
+                if value is not None:
+                    try:
+                        value = decode(value)
+                    except (ValueError, KeyError):
+                        raise ValueError('Bad value for column', col.name, row, value)
+            values.append(value)
+        ret[col.name] = values
+    return ret
+
+def _toarray(data, columns):
+    if np is None:
+        raise ImportError('NumPy is required for structured arrays')
+    n = len(data.values()[0]) if data else 0
+    array = np.empty(n, dtype=[(col.name, col.dtype) for col in columns])
+    for col in columns:
+        values = data[col.name]
+        # NumPy can't hold None in numeric columns, so fill them in
+        kind = col.dtype[0]
+        if kind != 'O' and None in values:
+            if kind == 'f':
+                fill = np.nan
+            elif kind == 'M':
+                fill = np.datetime64('NaT')
+            elif kind == '?':
+                fill = False
+            else:
+                fill = 0
+            values = [fill if v is None else v for v in values]
+        array[col.name] = values
+    return array
+
+def toarray(objs, columns=None):
+    '''
+    Convert a list of SchemaObjects into a NumPy structured array.
+
+    Takes the same arguments as L{tocolumns}.  Missing values become NaN
+    in float columns, NaT in date columns, False in boolean columns and
+    0 in integer columns.
+    '''
+    if columns is None:
+        columns = schema(type(objs[0])) if len(objs) else []
+    return _toarray(tocolumns(objs, columns), columns)
+
+def xmltoarray(elems, cls, columns=None):
+    '''
+    Convert a list of XML elements straight into a NumPy structured
+    array, without building SchemaObjects.
+
+    Takes the same arguments as L{xmlcolumns}.  Missing values are filled
+    in as for L{toarray}.
+    '''
+    if columns is None:
+        columns = schema(cls)
+    return _toarray(xmlcolumns(elems, cls, columns), columns)
+
+# VIM options (place at end of file)
+# vim: ts=4 sts=4 sw=4 expandtab:
@@ -31,12 +31,19 @@
 from bubbles.xmlimpl import ET
 from bubbles.util import ns
 from bubbles.dobject import DynamicObject
+from bubbles.util.keylist import KeyList
+from bubbles.util.urlcache import urlcache
+from bubbles.util import strpool
+from bubbles.util import memory
 from bubbles.util.ordered_dict import OrderedDict
-from bubbles.xsd.types import converter
+from bubbles.xsd.types import converter, converters
 
 import threading
 import re
-import urllib2 as u2
+import json
+from copy import deepcopy
+from bisect import bisect_left
+from timeit import default_timer as _timer
 from urlparse import urljoin
 from logging import getLogger
 log=getLogger(__name__)
@@ -52,6 +59,24 @@ xsi_type = ET.QName(ns.XSI, 'type')
 xsi_nil = ET.QName(ns.XSI, 'nil')
 xsi_nil_true = {xsi_nil: "true"}
 
+class Literal(unicode):
+    '''
+    A string that is serialized as is, whatever the type of the field
+    it is in.
+    '''
+    __slots__ = ()
+
+def _tostr(type, value):
+    '''
+    Convert value to a string for a field of xs: type.
+    '''
+    if isinstance(value, Literal):
+        return value
+    return converter(type).tostr(value)
+
+# Per-thread deserialization state
+_local = threading.local()
+
 class SchemaValidationError(Exception):
     pass
 
@@ -64,6 +89,11 @@ class _SchemaLoader:
         self.schemas = {}
         self.allns = {}
         self.revns = {}
+        self.resolvers = {}
+        # Each thread gets its own validators (see validator)
+        self.local = threading.local()
+        # Fetches and parses documents by URL
+        self.urlcache = urlcache
 
     def __call__(self):
         return _SchemaLoader()
@@ -90,7 +120,7 @@ class _SchemaLoader:
             root = schema
         else:
             schema = urljoin(pathinfo, schema)
-            root = ET.parse(u2.urlopen(schema)).getroot()
+            root = self.urlcache.parse(schema)
 
         # Get the target namespace.  Exit early if we already know this schema.
         targetNamespace = root.get('targetNamespace')
@@ -99,18 +129,21 @@ class _SchemaLoader:
 
         # Add a new entry to our dictionary
         if not fragment:
-            self.schemas[targetNamespace] = { 'root': root, 'types': {}, 'elements': {}, 'groups': {}, 'validator': None, 'basecls': basecls }
+            self.schemas[targetNamespace] = { 'root': root, 'types': {}, 'elements': {}, 'groups': {}, 'basecls': basecls }
 
         # Update our "all namespaces" dictionary and get references to the
         # various subdictionaries we'll need
         self.allns.update(root.nsmap)
         self.revns.update((v,k) for k,v in root.nsmap.items() if k not in (None, 'tns'))
+        self.resolvers.clear()
+        # Throw away every thread's validators; the schemas have changed
+        self.local = threading.local()
         types = self.schemas[targetNamespace]['types']
         elements = self.schemas[targetNamespace]['elements']
         groups = self.schemas[targetNamespace]['groups']
 
         # Process includes
-        includes = []
+        includes = set()
         while True:
             # Get the list of includes
             inclist = root.findall(ns.expand('xs:include'))
@@ -126,20 +159,21 @@ class _SchemaLoader:
                 if location in includes:
                     # skip if we've processed this schema
                     continue
-                includes.append(location)
+                includes.add(location)
                 url = urljoin(pathinfo, location)
 
                 # Parse the XML and append it to the root document
                 # We probably *should* include it into the place where the
                 # xs:include node was, but for now, punt and append it
                 # to the end of the document
-                inc = ET.parse(u2.urlopen(url)).getroot()
+                inc = self.urlcache.parse(url)
                 root.extend(inc)
 
-        # Process imports
+        # Process imports.  Don't fetch schemas for namespaces we
+        # already know.
         for el in root.findall(ns.expand('xs:import')):
             location = el.get('schemaLocation')
-            if location:
+            if location and el.get('namespace') not in self.schemas:
                 self.load(location, pathinfo=pathinfo)
         # Find all first-level tags we care about and reference them
         # in the types/elements/groups dictionaries
@@ -169,6 +203,25 @@ class _SchemaLoader:
 
         return targetNamespace
 
+    def resolver(self, targetNamespace=None):
+        '''
+        Get a Resolver for all of the namespaces known to this loader.
+
+        @type targetNamespace: str
+        @param targetNamespace: Optional.  The namespace for unprefixed names.
+        @rtype: L{ns.Resolver}
+        '''
+        try:
+            return self.resolvers[targetNamespace]
+        except KeyError:
+            pass
+        tns = {}
+        if targetNamespace is not None:
+            tns['targetNamespace'] = targetNamespace
+        r = ns.Resolver(self.allns, **tns)
+        self.resolvers[targetNamespace] = r
+        return r
+
     def schema(self, namespace):
         '''Get the schema corresponding to namespace'''
         if '}' in namespace:
@@ -214,12 +267,60 @@ class _SchemaLoader:
         cls = self.schemas[namespace]['basecls']
         return cls
 
+    def validator(self, namespace):
+        '''
+        Get the validator for namespace.
+
+        lxml validators keep their error log in the validator, so they
+        can't be shared between threads.  Each thread builds and keeps
+        its own.
+        '''
+        try:
+            validators = self.local.validators
+        except AttributeError:
+            validators = self.local.validators = {}
+        try:
+            return validators[namespace]
+        except KeyError:
+            pass
+        root = self.schemas[namespace]['root']
+        if root is None:
+            raise TypeError("Schema was stripped without keeping validators", namespace)
+        validator = ET.XMLSchema(root)
+        validators[namespace] = validator
+        return validator
+
+    def strip(self, validators=False):
+        '''
+        Free the schema trees once the types needed at runtime have
+        been built (see L{Builder.compile_all}).  Builders can't build
+        new types from this loader afterwards, so only strip a loader
+        whose builders are all warmed up.
+
+        @type validators: bool
+        @param validators: Optional.  Keep the schema documents so that
+            responses can still be validated.
+        @rtype: int
+        @return: The number of XML elements freed
+        '''
+        freed = 0
+        for schema in self.schemas.values():
+            if not validators:
+                freed += memory.elements(schema['root'])
+                schema['root'] = None
+            schema['types'] = {}
+            schema['elements'] = {}
+            schema['groups'] = {}
+        if not validators:
+            self.local = threading.local()
+        # Parsed documents are kept by URL too
+        freed += memory.elements(*self.urlcache.roots.values())
+        self.urlcache.clear()
+        return freed
+
     def validate(self, element, onerror='raise'):
         (namespace, name) = ns.split(element.tag)
-        validator = self.schemas[namespace]['validator']
-        if validator is None:
-            validator = ET.XMLSchema(self.schemas[namespace]['root'])
-            self.schemas[namespace]['validator'] = validator
+        validator = self.validator(namespace)
 
         errlog = None
         if validator(element) == False:
@@ -306,15 +407,27 @@ class SchemaObject(DynamicObject):
         Examine the inheritance heirarchy of this class and
         construct the template.
         '''
-        d = OrderedDict()
-        for c in cls.__mro__[::-1]:
-            for tmpl in getattr(c, '__template__', []):
-                d[tmpl[0]] = tmpl
-        return d.values()
+        # The templates of the base classes have already been merged
+        # with their own bases, so only the direct bases are needed.
+        index = {}
+        merged = []
+        templates = [getattr(c, '__template__', []) for c in cls.__bases__[::-1]]
+        templates.append(cls.__dict__.get('__template__', []))
+        for template in templates:
+            for tmpl in template:
+                # A redefined field replaces the original in place
+                i = index.get(tmpl[0])
+                if i is None:
+                    index[tmpl[0]] = len(merged)
+                    merged.append(tmpl)
+                else:
+                    merged[i] = tmpl
+        return merged
 
-    def _make_type(self, value, type):
+    def _make_type(self, value, type, validate=None):
         '''
-        Parse value and convert it to type
+        Parse value and convert it to type.  validate, if not None, is
+        the __validate__ for a SchemaObject built from value.
         '''
         try:
             iselem = False
@@ -335,17 +448,36 @@ class SchemaObject(DynamicObject):
                 if iselem:
                     value = value.text
                 c = converter(type)
-                if value is not None and not c.check(value):
-                    value = c.fromstr(value)
+                if value is not None:
+                    if not c.check(value):
+                        value = c.decode(value)
+                    pool = strpool.current()
+                    if pool is not None:
+                        value = pool(value)
             else:
                 if value == "":
                     value = None
-                value = self.__builder__.factory(type)(value, __relax__=self.__relax__)
+                value = self.__builder__.factory(type)(value, __relax__=self.__relax__,
+                        __validate__=validate)
         except ValueError:
             # leave the value as-is
             pass
         return value
 
+    def _decode(self, value, type, islist):
+        '''
+        Convert the XML value (or list of values) of a field to type.
+        '''
+        if islist:
+            return [self._make_type(v, type) for v in value]
+        return self._make_type(value, type)
+
+    def _setxml(self, name, type, value, islist):
+        '''
+        Set a field from its XML value (or list of values).
+        '''
+        self[name] = self._decode(value, type, islist)
+
     def __fromiter__(self, items):
         extra = False
         if not isinstance(items, dict):
@@ -399,15 +531,60 @@ class SchemaObject(DynamicObject):
         if extra:
             DynamicObject.__fromiter__(self, items)
 
+    def _dispatch(self):
+        '''
+        Get the map of child element tags to template positions for
+        this class.  Built on first use and kept on the class.
+        '''
+        cls = self.__class__
+        dispatch = cls.__dict__.get('__dispatch__')
+        if dispatch is None:
+            dispatch = {}
+            for i, (name, type, default, minmax, flags) in enumerate(self.__template__):
+                if not (flags & (ATTRIBUTE | PROPERTY | ANY)):
+                    dispatch[self.__nsx__(name)] = i
+            cls.__dispatch__ = dispatch
+        return dispatch
+
     def __fromxml__(self, elem):
-        if self.__validate__:
+        if self.__validate__ and not getattr(_local, 'validating', False):
+            # The objects built for elem's children aren't given
+            # __validate__, but they inherit it when validation is
+            # turned on for a whole class (SchemaObject.__validate__ =
+            # 'log').  Validating elem covers them, and validating a
+            # child on its own fails unless it is a global element.
             self.__builder__.loader.validate(elem, self.__validate__)
+            _local.validating = True
+            try:
+                self._fromxml(elem)
+            finally:
+                _local.validating = False
+        else:
+            self._fromxml(elem)
 
+    def _fromxml(self, elem):
         lat = len(self.__attrchar__)
         extra = False
+        template = self.__template__
+
+        # Sort the children into per-field lists in a single pass.
+        # Children that don't belong to any field are kept for xs:any.
+        dispatch = self._dispatch()
+        found = {}
+        unknown = []
+        for child in elem:
+            i = dispatch.get(child.tag)
+            if i is None:
+                unknown.append(child)
+            elif i in found:
+                found[i].append(child)
+            else:
+                found[i] = [child]
+
         # Iterate over the template and construct the object from
         # the template descriptions
-        for (name, type, default, minmax, flags) in self.__template__:
+        for i in xrange(len(template)):
+            (name, type, default, minmax, flags) = template[i]
             # If this node is an "xs:any" node, note it for later and skip
             if flags & ANY:
                 extra = True
@@ -422,8 +599,8 @@ class SchemaObject(DynamicObject):
                 # If its a property, get the value from the element text
                 value = [elem.text]
             else:
-                # Otherwise, find all XML elements with the field name
-                value = elem.findall(self.__nsx__(name))
+                # Otherwise, use the XML elements with the field name
+                value = found.get(i, ())
 
             # If there is no value list, but this is an xs:choice node, skip
             if len(value) == 0 and (flags & CHOICE):
@@ -443,16 +620,18 @@ class SchemaObject(DynamicObject):
                 # If the value is present in the XML, or is required
                 # by the template
                 if value is not None or minmax[0] == 1:
-                    value = self._make_type(value, type)
+                    self._setxml(name, type, value, False)
+                else:
+                    self[name] = value
             else:
                 # The field is a list
-                value = [self._make_type(v, type) for v in value]
-            self[name] = value
+                self._setxml(name, type, value, True)
 
         # If there are xs:any items, fall back to the schemaless unmarshaller
         # in the base class
         if extra:
-            DynamicObject.__fromxml__(self, elem, ignore=self.__keylist__[:])
+            DynamicObject.__fromxml__(self, elem, ignore=set(self.__keylist__),
+                    children=unknown)
 
     def __xml__(self, tag=None, node=None, nsmap=None):
         lat = len(self.__attrchar__)
@@ -486,7 +665,7 @@ class SchemaObject(DynamicObject):
                 continue
             elif (flags & ATTRIBUTE):
                 # Handle attributes.  Skip attributes that are optional
-                value = converter(type).tostr(value)
+                value = _tostr(type, value)
                 if value is None:
                     value = ''
                 if value is not None or minmax[0]:
@@ -494,7 +673,7 @@ class SchemaObject(DynamicObject):
                 continue
             elif (flags & PROPERTY):
                 # Property
-                node.text = converter(type).tostr(value)
+                node.text = _tostr(type, value)
                 continue
 
             qname = self.__nsx__(name)
@@ -511,13 +690,13 @@ class SchemaObject(DynamicObject):
                 elif type.startswith('xs:'):
                     # Primitive type
                     n = ET.Element(qname)
-                    n.text = converter(type).tostr(v)
+                    n.text = _tostr(type, v)
                     node.append(n)
                 elif flags & SIMPLE:
                     # Primitive type
                     type = self.__builder__.factory(type).__simple__
                     n = ET.Element(qname)
-                    n.text = converter(type).tostr(v)
+                    n.text = _tostr(type, v)
                     node.append(n)
                 elif isinstance(v, DynamicObject):
                     # Dynamic object or subclass, so marshall and append
@@ -542,6 +721,149 @@ class SchemaObject(DynamicObject):
 class Enumeration(SchemaObject):
     pass
 
+# Marks a template field that hasn't been set in a CompactSchemaObject
+_MISSING = object()
+
+class CompactSchemaObject(SchemaObject):
+    '''
+    Base class for complexTypes derived from XML schema that keeps its
+    fields in a list indexed by template position rather than in the
+    instance __dict__.  The __dict__ is only created if something is
+    stored in it, so it is normally empty.
+
+    Use Builder(compact=True) to generate these.  Fields that aren't in
+    the template (from xs:any) go into a side table that is only created
+    when needed.  Keys always come back in template order, followed by
+    the xs:any fields in the order they were set.
+    '''
+    __slots__ = ('__values__', '__extra__', '__relax__')
+    # Map of field name to position in __values__.  Set by the Builder.
+    __fields__ = {}
+
+    def _getkeylist(self):
+        keys = KeyList(t[0] for t, v in zip(self.__template__, self.__values__)
+                if v is not _MISSING)
+        if self.__extra__:
+            for k in self.__extra__:
+                keys.append(k)
+        return keys
+
+    def _setkeylist(self, keys):
+        # DynamicObject.__init__ assigns an empty keylist; use that as
+        # the cue to set up the field storage.
+        self.__values__ = [_MISSING] * len(self.__template__)
+        self.__extra__ = None
+
+    __keylist__ = property(_getkeylist, _setkeylist)
+
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails
+        if name.startswith('__'):
+            raise AttributeError(name)
+        i = self.__fields__.get(name)
+        if i is not None:
+            value = self.__values__[i]
+            if value is not _MISSING:
+                return value
+        elif self.__extra__ and name in self.__extra__:
+            return self.__extra__[name]
+        clsname = self.__class__.__name__
+        raise AttributeError("%s has no attribute '%s'" % (clsname, name))
+
+    def __setattr__(self, name, value):
+        i = self.__fields__.get(name)
+        if i is not None:
+            self.__values__[i] = value
+        elif name.startswith('__') and name.endswith('__'):
+            object.__setattr__(self, name, value)
+        else:
+            if self.__extra__ is None:
+                self.__extra__ = OrderedDict()
+            self.__extra__[name] = value
+
+    def __delattr__(self, name):
+        i = self.__fields__.get(name)
+        if i is not None and self.__values__[i] is not _MISSING:
+            self.__values__[i] = _MISSING
+        elif self.__extra__ and name in self.__extra__:
+            del self.__extra__[name]
+        else:
+            clsname = self.__class__.__name__
+            raise AttributeError("%s has no attribute '%s'" % (clsname, name))
+
+    def __iter__(self):
+        for t, v in zip(self.__template__, self.__values__):
+            if v is not _MISSING:
+                yield (t[0], v)
+        if self.__extra__:
+            for k, v in self.__extra__.items():
+                yield (k, v)
+
+    def __len__(self):
+        n = len(self.__values__) - self.__values__.count(_MISSING)
+        if self.__extra__:
+            n += len(self.__extra__)
+        return n
+
+    def __contains__(self, name):
+        i = self.__fields__.get(name)
+        if i is not None:
+            return self.__values__[i] is not _MISSING
+        return bool(self.__extra__) and name in self.__extra__
+
+class LazySchemaObject(SchemaObject):
+    '''
+    Base class for complexTypes derived from XML schema that converts its
+    fields from XML only when they are first read.
+
+    Use Builder(lazy=True) to generate these.  The object keeps references
+    to the XML nodes of the fields it hasn't converted yet, which keeps
+    the whole document in memory until every field has been read.
+    Iterating over the object, printing it or converting it back to XML
+    reads every field.
+    '''
+    def _setxml(self, name, type, value, islist):
+        pending = self.__dict__.get('__pending__')
+        if pending is None:
+            pending = self.__pending__ = {}
+        pending[name] = (value, type, islist)
+        self.__keylist__.append(name)
+
+    def _decode(self, value, type, islist):
+        # The fields are built after __fromxml__ has returned, so nothing
+        # stops them validating on their own when validation is turned on
+        # for a whole class.  Validating this object covered them.
+        if islist:
+            return [self._make_type(v, type, False) for v in value]
+        return self._make_type(value, type, False)
+
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails
+        if name.startswith('__'):
+            raise AttributeError(name)
+        pending = self.__dict__.get('__pending__')
+        if pending and name in pending:
+            (value, type, islist) = pending.pop(name)
+            value = self._decode(value, type, islist)
+            self.__dict__[name] = value
+            return value
+        clsname = self.__class__.__name__
+        raise AttributeError("%s has no attribute '%s'" % (clsname, name))
+
+    def __setattr__(self, name, value):
+        pending = self.__dict__.get('__pending__')
+        if pending:
+            pending.pop(name, None)
+        DynamicObject.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        pending = self.__dict__.get('__pending__')
+        if pending and name in pending:
+            del pending[name]
+            self.__keylist__.remove(name)
+        else:
+            DynamicObject.__delattr__(self, name)
+
 class Builder:
     '''
     A Builder examines XML schema and constructs python types from the
@@ -550,7 +872,7 @@ class Builder:
     attr_use = { 'optional': (0, 1), 'prohibited': (0, 0), 'required': (1, 1) }
     cache = {}
 
-    def __init__(self, loader=SchemaLoader, namespace=None, basecls=None):
+    def __init__(self, loader=SchemaLoader, namespace=None, basecls=None, compact=False, lazy=False):
         '''
         Constructor for Builder
  
@@ -558,10 +880,19 @@ class Builder:
         @param loader: Optional.  The SchemaLoader holding the schemas of interest
         @type namespace: str
         @param namespace: Optional.  The default namespace used by this builder.
+        @type basecls: class
+        @param basecls: Optional.  The base class for generated types.
+        @type compact: bool
+        @param compact: Optional.  Generate CompactSchemaObject types, which
+            use far less memory per instance.
+        @type lazy: bool
+        @param lazy: Optional.  Generate LazySchemaObject types, which
+            convert their fields from XML on first use.
         '''
         self.loader = loader
         self.namespace = namespace
         self.lock = threading.Lock()
+        self.resolvers = {}
         # Undocumented feature: Extra bases may be added to the class
         # heirarchy on a per-builder basis
         self.bases = ()
@@ -574,19 +905,50 @@ class Builder:
         self.minOccurs = 0
         self.maxOccurs = 1
         self.flags = 0
+        self.compact = compact
+        if compact and lazy:
+            raise TypeError("A Builder can't be both compact and lazy")
+        if compact or lazy:
+            special = CompactSchemaObject if compact else LazySchemaObject
+            basecls = basecls or special
+            if not issubclass(basecls, special):
+                raise TypeError("Builder needs a %s base class" % special.__name__, basecls)
+            # Don't share classes with other kinds of builder
+            self.cache = {}
         self.basecls = basecls or SchemaObject
 
-    def nsexpand(self, s, target=True):
+    def resolver(self, target=True, root=None):
+        '''
+        Get a Resolver for the namespaces of the schema being processed,
+        or of root if given.
+        '''
+        if root is None:
+            root = self.root
+        key = (root, target)
+        try:
+            return self.resolvers[key]
+        except KeyError:
+            pass
         tns = {}
         if target:
-            tns['targetNamespace'] = self.root.get('targetNamespace')
-        return ns.expand(s, self.root.nsmap, **tns)
+            tns['targetNamespace'] = root.get('targetNamespace')
+        r = ns.Resolver(root.nsmap, **tns)
+        self.resolvers[key] = r
+        return r
+
+    def nsexpand(self, s, target=True):
+        return self.resolver(target).expand(s)
 
     def nssplit(self, s, target=True):
-        tns = {}
-        if target:
-            tns['targetNamespace'] = self.root.get('targetNamespace')
-        return ns.split(s, self.root.nsmap, **tns)
+        return self.resolver(target).split(s)
+
+    def strip(self):
+        '''
+        Drop the references to schema trees kept while building types.
+        '''
+        with self.lock:
+            self.resolvers = {}
+            self.root = None
 
     def factory(self, typename):
         '''
@@ -601,10 +963,8 @@ class Builder:
             return self._factory(typename)
 
     def _factory(self, typename, **kwargs):
-        if 'targetNamespace' not in kwargs and self.namespace:
-            kwargs['targetNamespace'] = self.namespace
-
-        typename = ns.expand(typename, self.loader.allns, **kwargs)
+        targetNamespace = kwargs.get('targetNamespace', self.namespace or None)
+        typename = self.loader.resolver(targetNamespace).expand(typename)
         cls = None
         try:
             cls = self.cache[typename]
@@ -618,6 +978,9 @@ class Builder:
                 if node is not None and 'type' in node.attrib:
                     tns, _ = self.nssplit(typename)
                     cls = self._factory(node.get('type'), targetNamespace=tns)
+                    # Remember the element too, so it can be found once
+                    # the schema trees have been stripped
+                    self.cache[typename] = cls
 
             if node is not None and cls is None:
                 self.process(node)
@@ -628,6 +991,103 @@ class Builder:
             raise TypeError("Unknown Type", typename)
         return cls
 
+    def _known(self, name):
+        try:
+            return (self.loader.type(name) is not None or
+                    self.loader.element(name) is not None)
+        except KeyError:
+            return False
+
+    def _deps(self, name):
+        '''
+        Get the names of the types and elements that the type or element
+        name refers to.
+        '''
+        node = self.loader.type(name)
+        if node is None:
+            node = self.loader.element(name)
+        if node is None:
+            return []
+        root = self.loader.schema(name)
+        tns = self.resolver(True, root)
+        dflt = self.resolver(False, root)
+        deps = []
+        groups = set()
+        scan = [node]
+        while scan:
+            for el in scan.pop().iter():
+                if not isinstance(el.tag, basestring):
+                    continue
+                (namespace, tag) = tns.split(el.tag)
+                if tag in ('extension', 'restriction'):
+                    ref = tns.expand(el.get('base', ''))
+                elif tag in ('element', 'attribute') and el.get('type'):
+                    ref = dflt.expand(el.get('type'))
+                elif tag == 'element' and el.get('ref'):
+                    ref = tns.expand(el.get('ref'))
+                elif tag == 'group' and el.get('ref'):
+                    ref = tns.expand(el.get('ref'))
+                    if ref not in groups:
+                        groups.add(ref)
+                        scan.append(self.loader.group(ref))
+                    continue
+                else:
+                    continue
+                if ref != name and self._known(ref):
+                    deps.append(ref)
+        return deps
+
+    def compile_all(self):
+        '''
+        Build the classobjects for every type and element known to the
+        SchemaLoader.
+
+        Types are built after the types they refer to, so that building
+        any one type finds everything it needs in the cache rather than
+        recursing through the whole chain of base types.
+
+        @rtype: int
+        @return: The number of types and elements built
+        '''
+        names = []
+        for namespace, schema in self.loader.schemas.items():
+            if namespace == ns.XS:
+                continue
+            for name in schema['types']:
+                names.append('{%s}%s' % (namespace, name))
+            for name in schema['elements']:
+                names.append('{%s}%s' % (namespace, name))
+
+        # Depth-first walk of the references to order the names
+        # dependencies-first.  The walk keeps its own stack so that long
+        # chains of types can't hit the recursion limit.
+        order = []
+        seen = set()
+        for start in names:
+            if start in seen:
+                continue
+            seen.add(start)
+            stack = [(start, iter(self._deps(start)))]
+            while stack:
+                (name, deps) = stack[-1]
+                for dep in deps:
+                    if dep not in seen:
+                        seen.add(dep)
+                        stack.append((dep, iter(self._deps(dep))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(name)
+
+        count = 0
+        for name in order:
+            try:
+                self.factory(name)
+                count += 1
+            except Exception as ex:
+                log.warning("Can't build %s: %s", name, ex)
+        return count
+
     @staticmethod
     def tryint(value):
         try:
@@ -779,6 +1239,8 @@ class Builder:
             '__builder__': self,
             '__simple__': self.restriction,
         }
+        if self.compact:
+            cvars['__slots__'] = ()
         bases = self.bases + (self.extension,)
         t = type(self.typename, bases, cvars)
         self.cache[self.typename] = t
@@ -801,6 +1263,8 @@ class Builder:
 
         # Merge all templates from the class heirarchy
         t.__template__ = t._template()
+        if issubclass(t, CompactSchemaObject):
+            t.__fields__ = dict((tmpl[0], i) for i, tmpl in enumerate(t.__template__))
         self.pop(state)
 
     def xs_complexType(self, node, **kwargs):
@@ -859,7 +1323,260 @@ class Builder:
     def xs_maxInclusive(self, node, **kwargs):
         pass
 
+# Upper bounds, in seconds, of the buckets of the timing histograms.
+# The last bucket counts the calls slower than all of them.
+_buckets = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
 
+class _TimedConverter(object):
+    '''
+    Stands in for a converter in types.converters while instrumentation
+    is enabled, timing its conversions.
+    '''
+    def __init__(self, stats, typestr, conv):
+        self.stats = stats
+        self.typestr = typestr
+        self.conv = conv
+        self.check = conv.check
+
+    def __getattr__(self, name):
+        return getattr(self.conv, name)
+
+    def _timed(self, kind, func, value):
+        start = _timer()
+        try:
+            return func(value)
+        finally:
+            self.stats._add(self.stats.converters, self.typestr, kind, _timer() - start)
+
+    def decode(self, value):
+        return self._timed('decode', self.conv.decode, value)
+
+    def fromstr(self, value):
+        return self._timed('decode', self.conv.fromstr, value)
+
+    def tostr(self, value):
+        return self._timed('tostr', self.conv.tostr, value)
+
+class Instrumentation(object):
+    '''
+    Opt-in counters and timers for building and marshalling SchemaObjects.
+
+    While enabled, it records for each SchemaObject class the instances
+    built and the calls to and time spent in __fromxml__, __fromiter__
+    and __xml__ (both including and excluding the time spent on nested
+    objects); the calls to and time spent in the converters of each
+    xs: type; and the Builder.factory cache hits, misses and time spent
+    building classobjects.  Each timing also comes as a histogram of
+    the calls by how long they took.
+
+    Instrumentation works by swapping instrumented methods into
+    SchemaObject and Builder, and timed converters into
+    types.converters, so it costs nothing while disabled.  Converters
+    that were looked up before it was enabled and kept aren't timed.
+    Use the module-level instance:
+
+        from bubbles.xsd.schema import instrument
+        instrument.enable()
+        c.hpoa.getBladeInfo(1)
+        print instrument.top(5)
+        instrument.dump(file('stats.json', 'w'))
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.saved = []
+        self.timed = {}
+        self.reset()
+
+    def reset(self):
+        '''Forget everything recorded so far.'''
+        with self.lock:
+            self.types = {}
+            self.converters = {}
+            self.factory = {}
+            self.factory_totals = {'hits': 0, 'misses': 0, 'time': 0.0}
+
+    def _add(self, table, name, kind, elapsed, own=None):
+        bucket = bisect_left(_buckets, elapsed)
+        with self.lock:
+            entry = table.get(name)
+            if entry is None:
+                entry = table[name] = {}
+            counter = entry.get(kind)
+            if counter is None:
+                counter = entry[kind] = {'calls': 0, 'time': 0.0,
+                        'histogram': [0] * (len(_buckets) + 1)}
+                if own is not None:
+                    counter['self'] = 0.0
+            counter['calls'] += 1
+            counter['time'] += elapsed
+            counter['histogram'][bucket] += 1
+            if own is not None:
+                counter['self'] += own
+
+    def _stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+            return stack
+
+    def _method(self, kind, func):
+        '''
+        Wrap a SchemaObject method to time it, keeping track of the
+        time spent in nested instrumented calls.
+        '''
+        def wrapper(obj, *args, **kwargs):
+            stack = self._stack()
+            stack.append(0.0)
+            start = _timer()
+            try:
+                return func(obj, *args, **kwargs)
+            finally:
+                elapsed = _timer() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self._add(self.types, obj.__class__.__name__, kind, elapsed, elapsed - nested)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def _new(self, func):
+        def wrapper(cls, *args, **kwargs):
+            if not cls.__simple__:
+                with self.lock:
+                    entry = self.types.get(cls.__name__)
+                    if entry is None:
+                        entry = self.types[cls.__name__] = {}
+                    entry['built'] = entry.get('built', 0) + 1
+            return func(cls, *args, **kwargs)
+        return staticmethod(wrapper)
+
+    def _factory(self, func):
+        def wrapper(builder, typename, **kwargs):
+            stack = self._stack()
+            depth = len(stack)
+            stack.append(0.0)
+            size = len(builder.cache)
+            start = _timer()
+            try:
+                return func(builder, typename, **kwargs)
+            finally:
+                elapsed = _timer() - start
+                stack.pop()
+                kind = 'misses' if len(builder.cache) != size else 'hits'
+                with self.lock:
+                    entry = self.factory.get(typename)
+                    if entry is None:
+                        entry = self.factory[typename] = {'hits': 0, 'misses': 0, 'time': 0.0,
+                                'histogram': [0] * (len(_buckets) + 1)}
+                    entry[kind] += 1
+                    self.factory_totals[kind] += 1
+                    entry['histogram'][bisect_left(_buckets, elapsed)] += 1
+                    if kind == 'misses':
+                        entry['time'] += elapsed
+                        # Nested misses are part of the outermost one
+                        if depth == 0:
+                            self.factory_totals['time'] += elapsed
+        return wrapper
+
+    def enable(self):
+        '''Start recording.'''
+        with self.lock:
+            if self.enabled:
+                return
+            self.enabled = True
+        self.saved = []
+        patches = [
+            (SchemaObject, '__new__', self._new(SchemaObject.__dict__['__new__'].__func__)),
+            (SchemaObject, '__fromxml__', self._method('fromxml', SchemaObject.__dict__['__fromxml__'])),
+            (SchemaObject, '__fromiter__', self._method('fromiter', SchemaObject.__dict__['__fromiter__'])),
+            (SchemaObject, '__xml__', self._method('xml', SchemaObject.__dict__['__xml__'])),
+            (Builder, '_factory', self._factory(Builder.__dict__['_factory'])),
+        ]
+        for (cls, name, func) in patches:
+            self.saved.append((cls, name, cls.__dict__[name]))
+            setattr(cls, name, func)
+        # Everything that looks converters up goes through this dict
+        self.timed = {}
+        for (typestr, conv) in converters.items():
+            timed = self.timed[typestr] = _TimedConverter(self, typestr, conv)
+            converters[typestr] = timed
+
+    def disable(self):
+        '''Stop recording.  What was recorded is kept.'''
+        with self.lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+        for (cls, name, func) in self.saved:
+            setattr(cls, name, func)
+        self.saved = []
+        for (typestr, timed) in self.timed.items():
+            # Unless a converter was registered in the meantime
+            if converters.get(typestr) is timed:
+                converters[typestr] = timed.conv
+        self.timed = {}
+
+    def report(self):
+        '''
+        Get a copy of everything recorded, as plain dicts.
+
+        Each histogram counts the calls by time taken: the first
+        bucket those up to buckets[0] seconds, the next those up to
+        buckets[1] and so on, and the last those slower than all of
+        them.  The factory histograms count hits and misses.
+
+        @rtype: dict
+        @return: {'types': {classname: {'built': n, 'fromxml': {'calls': n,
+            'time': seconds, 'self': seconds, 'histogram': [n, ...]},
+            'fromiter': ..., 'xml': ...}}, 'converters': {'xs:type':
+            {'decode': {'calls': n, 'time': seconds, 'histogram': [n, ...]},
+            'tostr': ...}}, 'factory': {'hits': n, 'misses': n, 'time': seconds,
+            'types': {typename: {'hits': n, 'misses': n, 'time': seconds,
+            'histogram': [n, ...]}}}, 'buckets': [seconds, ...]}
+        '''
+        with self.lock:
+            factory = dict(self.factory_totals)
+            factory['types'] = deepcopy(self.factory)
+            return {
+                'types': deepcopy(self.types),
+                'converters': deepcopy(self.converters),
+                'factory': factory,
+                'buckets': list(_buckets),
+            }
+
+    def top(self, n=10, key='self'):
+        '''
+        Get the classes that took the most time marshalling and
+        unmarshalling.
+
+        @type key: str
+        @param key: Optional.  'self' for the time excluding nested
+            objects, 'time' for the time including them.
+        @rtype: list
+        @return: [(classname, seconds), ...], slowest first
+        '''
+        totals = []
+        with self.lock:
+            for (name, entry) in self.types.items():
+                t = sum(v[key] for k, v in entry.items() if k != 'built')
+                totals.append((name, t))
+        totals.sort(key=lambda x: x[1], reverse=True)
+        return totals[:n]
+
+    def json(self, **kwargs):
+        '''Get the report as JSON.  kwargs are passed to json.dumps.'''
+        return json.dumps(self.report(), **kwargs)
+
+    def dump(self, fp, **kwargs):
+        '''Write the report as JSON to the file-like object fp.'''
+        json.dump(self.report(), fp, **kwargs)
+
+# Instrumentation for all SchemaObjects and Builders
+instrument = Instrumentation()
 
 # VIM options (place at end of file)
 # vim: ts=4 sts=4 sw=4 expandtab:
@@ -32,6 +32,33 @@ import re
 from datetime import datetime, timedelta, date, time
 
 class xs_type:
+    # decode remembers the results of fromstr for up to this many
+    # different strings.  Zero turns the memo off.
+    memosize = 0
+
+    @classmethod
+    def decode(cls, value):
+        '''
+        Convert value from a string, reusing the result if this converter
+        has seen the same string recently.
+
+        Only use a memo for converters that return immutable values.
+        '''
+        if not cls.memosize:
+            return cls.fromstr(value)
+        memo = cls.__dict__.get('_memo')
+        if memo is None:
+            memo = cls._memo = {}
+        try:
+            return memo[value]
+        except KeyError:
+            pass
+        ret = cls.fromstr(value)
+        if len(memo) >= cls.memosize:
+            memo.clear()
+        memo[value] = ret
+        return ret
+
     @classmethod
     def check(cls, value):
         raise NotImplementedError
@@ -113,6 +140,7 @@ class xs_double(xs_float):
 
 _dt = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})T(\d{2}):?(\d{2}):?(\d{2})(?:\.(\d{6}))?(?:Z|(?:([+-]\d{2}):?(\d{2})))?')
 class xs_dateTime(xs_type):
+    memosize = 1024
     @classmethod
     def check(cls, value):
         return isinstance(value, datetime)
@@ -133,20 +161,22 @@ class xs_dateTime(xs_type):
                 #       8        timezone offset hours (optional) - WILL have leading sign character
                 #       9        timezone offset minutes (optional,but must exist if group 8 exists)
 
-                tm = datetime(int(match.group(1),10),
-                             int(match.group(2),10),
-                             int(match.group(3),10),
-                             int(match.group(4),10),
-                             int(match.group(5),10),
-                             int(match.group(6),10))
-
-                if match.group(7) is not None:
+                g = match.groups()
+                microseconds = 0
+                if g[6] is not None:
                     # microseconds provided 
-                    tm += timedelta(microseconds = int(match.group(7),10))
-            
-                if match.group(8) is not None:
+                    microseconds = int(g[6], 10)
+                tm = datetime(int(g[0],10),
+                             int(g[1],10),
+                             int(g[2],10),
+                             int(g[3],10),
+                             int(g[4],10),
+                             int(g[5],10),
+                             microseconds)
+
+                if g[7] is not None:
                     # if group 8 is present, then group 9 is also
-                    tm += timedelta(hours=int(match.group(8),10),minutes=int(match.group(9),10))
+                    tm += timedelta(hours=int(g[7],10),minutes=int(g[8],10))
                 return tm
         except:
             pass
@@ -160,6 +190,7 @@ class xs_dateTime(xs_type):
 
 _date = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})(?:Z|(?:([+-]\d{2}):?(\d{2})))?')
 class xs_date(xs_type):
+    memosize = 1024
     @classmethod
     def check(cls, value):
         return isinstance(value, date)
@@ -193,6 +224,7 @@ class xs_date(xs_type):
 
 _time = re.compile(r'(\d{2}):?(\d{2}):?(\d{2})(?:\.(\d{6}))?(?:Z|(?:([+-]\d{2}):?(\d{2})))?')
 class xs_time(xs_type):
+    memosize = 1024
     @classmethod
     def check(cls, value):
         return isinstance(value, time)
@@ -255,6 +287,27 @@ converters = {
         'xs:time': xs_time,
 }
 
+def register(typestr, cls):
+    '''
+    Register a converter for an xs:type, replacing the built-in one.
+
+    @type typestr: str
+    @param typestr: Name of an xs:type like xs:string or xs:int.
+    @type cls: subclass of xs_type
+    @param cls: The converter.  Subclass the built-in converter and
+        override fromstr to plug in a faster parser.
+
+    Example:
+
+        class fast_dateTime(xs_dateTime):
+            @classmethod
+            def fromstr(cls, value):
+                return ciso8601.parse_datetime(value)
+
+        register('xs:dateTime', fast_dateTime)
+    '''
+    converters[typestr] = cls
+
 def converter(typestr):
     '''
     Get a converter for the requested xs:type.
@@ -0,0 +1,63 @@
+import os
+import unittest
+from StringIO import StringIO
+from bubbles.soap.client import Client, WSDL
+from bubbles.xsd.schema import SchemaLoader, SchemaObject, Builder
+from bubbles.util import ns
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+ENVELOPE = '''<?xml version="1.0"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:t="urn:test">
+<soapenv:Body>%s</soapenv:Body></soapenv:Envelope>'''
+
+TEMP = ENVELOPE % '<t:getTempResponse><t:temp unit="C">42</t:temp></t:getTempResponse>'
+
+def url(name):
+    return 'file://' + os.path.join(DATA, name)
+
+class Transport(object):
+    '''
+    Records the requests and answers each with respond(request), or
+    with the getTemp response.
+    '''
+    def __init__(self, respond=None):
+        self.sent = []
+        self.respond = respond or (lambda data: TEMP)
+
+    def open(self, req, timeout=None, **options):
+        data = req.get_data()
+        self.sent.append(data)
+        return StringIO(self.respond(data))
+
+class ClientTest(unittest.TestCase):
+    '''
+    Gives each test its own SchemaLoader and class cache, and counts
+    the elements the loader validates.
+    '''
+    def setUp(self):
+        self.saved = (Builder.cache, SchemaObject.__validate__)
+        Builder.cache = {}
+        self.loader = SchemaLoader()
+        self.validated = []
+        validate = self.loader.validate
+        def counting(element, onerror='raise'):
+            self.validated.append(element.tag)
+            return validate(element, onerror)
+        self.loader.validate = counting
+
+    def tearDown(self):
+        (Builder.cache, SchemaObject.__validate__) = self.saved
+
+    def wsdl(self, name='test.wsdl', **kwargs):
+        return WSDL(url(name), nsmap=dict(ns._defns), schemaloader=self.loader, **kwargs)
+
+    def client(self, name='test.wsdl', **kwargs):
+        '''
+        Make a client for a WSDL in tests/data.  compact and lazy go to
+        the WSDL, the rest to the Client.
+        '''
+        options = dict((k, kwargs.pop(k)) for k in ('compact', 'lazy') if k in kwargs)
+        kwargs.setdefault('url', 'http://x/')
+        kwargs.setdefault('transport', Transport())
+        return Client(self.wsdl(name, **options), **kwargs)
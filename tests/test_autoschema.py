@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from StringIO import StringIO
+from bubbles.misc import autoschema
+
+# The same tag is a different type under each GET_*, and each shard of
+# -j 4 sees a different one first
+CORPUS = [
+    '<RIBCL><GET_A><ITEM><X>1</X></ITEM><N>text</N></GET_A></RIBCL>',
+    '<RIBCL><GET_B><ITEM><Y>2</Y></ITEM><ITEM><Y>3</Y></ITEM></GET_B></RIBCL>',
+    '<RIBCL><GET_B><ITEM><Z>3</Z></ITEM></GET_B><GET_C><ITEM VALUE="5"/><ITEM><W>1</W></ITEM></GET_C></RIBCL>',
+    '<RIBCL><GET_A><ITEM><W>4</W></ITEM><N><Q>1</Q></N></GET_A><GET_C><ITEM><V>1</V></ITEM></GET_C></RIBCL>',
+]
+
+class AutoSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = []
+        for (i, text) in enumerate(CORPUS):
+            name = os.path.join(self.dir, '%d.xml' % i)
+            with open(name, 'w') as f:
+                f.write(text)
+            self.files.append(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_main(self, *args):
+        '''Run autoschema and return its output and warnings'''
+        out = os.path.join(self.dir, 'out.xsd')
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            ret = autoschema.main(['autoschema', '-o', out] + list(args) + self.files)
+            warnings = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(ret, 0)
+        with open(out) as f:
+            return (f.read(), warnings)
+
+    def test_jobs(self):
+        (serial, warnings) = self.run_main('-j', '1')
+        self.assertTrue('name="GB_Item"' in serial)
+        self.assertTrue('/Get_A/N has conflicting types: xs:string, N' in warnings)
+        for jobs in ('2', '4'):
+            self.assertEqual(self.run_main('-j', jobs), (serial, warnings))
+
+    def test_stream(self):
+        # Streaming guesses the same types, but may order interleaved
+        # ones differently, so compare them by name
+        def types(text):
+            schema = autoschema.AutoSchema.parse(text)
+            return sorted((ct.name, ct.__xmlstr__(tag='complexType')) for ct in schema.complexType)
+        (loaded, warnings) = self.run_main()
+        (streamed, swarnings) = self.run_main('-s')
+        self.assertEqual(types(streamed), types(loaded))
+        self.assertEqual(swarnings, warnings)
+
+    def test_stream_list(self):
+        # Repeated children make a list of one complexType
+        name = os.path.join(self.dir, 'big.xml')
+        with open(name, 'w') as f:
+            f.write('<RIBCL><GET_D>')
+            for i in range(20000):
+                f.write('<ITEM><ID>%d</ID><V>x</V></ITEM>' % i)
+            f.write('</GET_D></RIBCL>')
+        a = autoschema.AutoSchema('urn:xxx')
+        a.stream(name)
+        item = a.types['Item']
+        self.assertEqual([el.name for el in item.sequence.element], ['ID', 'V'])
+        self.assertEqual(a.types['Get_D'].sequence.element[0].maxOccurs, 'unbounded')
+
+    def test_merge(self):
+        # The shards see the types of the schema being merged with
+        base = os.path.join(self.dir, 'base.xsd')
+        a = autoschema.AutoSchema('urn:xxx')
+        a.ilo_primitives()
+        a.guess(self.files[2])
+        with open(base, 'w') as f:
+            f.write(a.output())
+        serial = self.run_main('-m', base, '-j', '1')
+        self.assertEqual(self.run_main('-m', base, '-j', '4'), serial)
+
+if __name__ == '__main__':
+    unittest.main()
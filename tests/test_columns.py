@@ -0,0 +1,42 @@
+import unittest
+from support import ClientTest
+from bubbles.xsd import columns
+from bubbles.xmlimpl import ET
+
+READINGS = '''<t:getReadingsResponse xmlns:t="urn:test">
+<t:reading ver="1"><t:id>1</t:id><t:value>2.5</t:value><t:ok>true</t:ok><t:b>7</t:b></t:reading>
+<t:reading><t:id>2</t:id><t:status>FAILED</t:status><t:b>8</t:b></t:reading>
+</t:getReadingsResponse>'''
+
+class ColumnsTest(ClientTest):
+    def setUp(self):
+        ClientTest.setUp(self)
+        self.builder = self.wsdl().builder
+        self.reading = self.builder.factory('{urn:test}Reading')
+
+    def test_schema(self):
+        names = [col.name for col in columns.schema(self.reading)]
+        self.assertEqual(names, ['id', 'name', '_ver', 'value', 'when', 'status', 'ok', 'a', 'b'])
+
+    def test_recursive(self):
+        node = self.builder.factory('{urn:test}Node')
+        self.assertEqual([col.name for col in columns.schema(node)], ['id'])
+
+    def test_xml(self):
+        elems = list(ET.fromstring(READINGS))
+        data = columns.xmlcolumns(elems, self.reading)
+        objs = self.builder.factory('{urn:test}getReadingsResponse')(ET.fromstring(READINGS)).reading
+        self.assertEqual(data, columns.tocolumns(objs))
+        self.assertEqual(data['value'], [2.5, None])
+        self.assertEqual(data['status'], [None, 'FAILED'])
+
+    def test_bad_value(self):
+        elems = list(ET.fromstring(READINGS.replace('>true<', '>yes<')))
+        try:
+            columns.xmlcolumns(elems, self.reading)
+            self.fail('bad value accepted')
+        except ValueError as ex:
+            self.assertEqual(ex.args[1:3], ('ok', 0))
+
+if __name__ == '__main__':
+    unittest.main()
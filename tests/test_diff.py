@@ -0,0 +1,67 @@
+import unittest
+from bubbles.dobject import DynamicObject
+from bubbles.diff import diff, Differ, Change, ADDED, REMOVED, MODIFIED
+
+def reading(id, value, tags=()):
+    return DynamicObject(id=id, value=value, tag=list(tags))
+
+def readings(*items):
+    return DynamicObject(bay=1, reading=list(items))
+
+KEYS = {'reading': 'id'}
+
+class DiffTest(unittest.TestCase):
+    def test_same(self):
+        old = readings(reading(1, 2.5), reading(2, 3.5))
+        new = readings(reading(1, 2.5), reading(2, 3.5))
+        self.assertEqual(diff(old, new, KEYS), [])
+        self.assertEqual(diff(old, new), [])
+
+    def test_keyed(self):
+        old = readings(reading(1, 2.5), reading(2, 3.5), reading(3, 0))
+        new = readings(reading(3, 0), reading(2, 4.5), reading(4, 1))
+        self.assertEqual(diff(old, new, KEYS), [
+            Change(REMOVED, 'reading[id=1]', old.reading[0], None),
+            Change(ADDED, 'reading[id=4]', None, new.reading[2]),
+            Change(MODIFIED, 'reading[id=2].value', 3.5, 4.5),
+        ])
+
+    def test_positional(self):
+        old = readings(reading(1, 2.5, ['a']))
+        new = readings(reading(1, 2.5, ['b', 'c']))
+        self.assertEqual(diff(old, new), [
+            Change(ADDED, 'reading[0].tag[1]', None, 'c'),
+            Change(MODIFIED, 'reading[0].tag[0]', 'a', 'b'),
+        ])
+
+    def test_fields(self):
+        old = DynamicObject(a=1, b=2)
+        new = DynamicObject(b=2, c=3)
+        self.assertEqual(diff(old, new), [
+            Change(REMOVED, 'a', 1, None),
+            Change(ADDED, 'c', None, 3),
+        ])
+
+    def test_nan(self):
+        nan = float('nan')
+        self.assertEqual(diff(reading(1, nan), reading(1, nan)), [])
+
+    def test_duplicate_key(self):
+        old = readings(reading(1, 2.5))
+        new = readings(reading(1, 2.5), reading(1, 3.5))
+        try:
+            diff(old, new, KEYS)
+            self.fail('duplicate key accepted')
+        except ValueError as ex:
+            self.assertEqual(ex.args[1:], ('reading', 'id', 1))
+
+    def test_differ(self):
+        differ = Differ(KEYS)
+        first = readings(reading(1, 2.5))
+        self.assertEqual(differ(first), [Change(ADDED, '', None, first)])
+        self.assertEqual(differ(readings(reading(1, 2.5))), [])
+        self.assertEqual(differ(readings(reading(1, 3.5))),
+                [Change(MODIFIED, 'reading[id=1].value', 2.5, 3.5)])
+
+if __name__ == '__main__':
+    unittest.main()
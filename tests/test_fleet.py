@@ -0,0 +1,73 @@
+import unittest
+import threading
+import time
+from urlparse import urlsplit
+from support import ClientTest, Transport
+from bubbles.soap.fleet import Fleet, _host
+
+class BlockingTransport(Transport):
+    '''
+    Hold each request for a while, and record the most requests in
+    flight at once, in total and per host.
+    '''
+    def __init__(self):
+        Transport.__init__(self)
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.total = self.peak_total = 0
+
+    def open(self, req, timeout=None, **options):
+        host = urlsplit(req.get_full_url()).hostname
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.total += 1
+            self.peak_total = max(self.peak_total, self.total)
+        try:
+            time.sleep(0.05)
+            return Transport.open(self, req, timeout, **options)
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+                self.total -= 1
+
+class FleetTest(ClientTest):
+    def setUp(self):
+        ClientTest.setUp(self)
+        self.c = self.client(validate='raise', validate_every=10)
+
+    def test_validate_every(self):
+        fleet = Fleet(self.c, concurrency=4)
+        targets = ['http://h%d/x' % i for i in range(41)]
+        results = list(fleet.run('getTemp', targets, 1))
+        self.assertEqual(len(results), 41)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(self.validated), 5)
+
+    def test_host(self):
+        self.assertEqual(_host('http://H1/x'), _host('http://h1:80/x'))
+        self.assertEqual(_host('https://h1/x'), _host('https://h1:443/y'))
+        self.assertNotEqual(_host('http://h1/x'), _host('https://h1/x'))
+
+    def test_limits(self):
+        transport = BlockingTransport()
+        c = self.client(transport=transport)
+        fleet = Fleet(c, concurrency=4, per_host=2)
+        targets = ['http://h%d/x%d' % (i % 3, i) for i in range(18)]
+        results = list(fleet.run('getTemp', targets, 1))
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(transport.sent), 18)
+        self.assertEqual(transport.peak_total, 4)
+        self.assertEqual(transport.peak, {'h0': 2, 'h1': 2, 'h2': 2})
+
+    def test_close(self):
+        fleet = Fleet(self.c, concurrency=4)
+        results = fleet.run('getTemp', ['http://h%d/x' % i for i in range(20)], 1)
+        self.assertTrue(next(results).ok)
+        results.close()
+        names = [t.name for t in threading.enumerate()]
+        self.assertFalse([n for n in names if n.startswith('bubbles-fleet-')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from support import ClientTest
+from bubbles.xsd.schema import Instrumentation
+from bubbles.xsd import types
+
+class InstrumentTest(ClientTest):
+    def setUp(self):
+        ClientTest.setUp(self)
+        self.instrument = Instrumentation()
+
+    def tearDown(self):
+        self.instrument.disable()
+        ClientTest.tearDown(self)
+
+    def test_report(self):
+        c = self.client()
+        self.instrument.enable()
+        for i in range(3):
+            self.assertEqual(c.TestService.getTemp(i).value, 42)
+        self.instrument.disable()
+        report = self.instrument.report()
+        buckets = len(report['buckets']) + 1
+
+        # The int in the response and the ints in the requests
+        conv = report['converters']['xs:int']
+        self.assertEqual(conv['decode']['calls'], 3)
+        self.assertEqual(conv['tostr']['calls'], 3)
+        for counter in conv.values():
+            self.assertEqual(len(counter['histogram']), buckets)
+            self.assertEqual(sum(counter['histogram']), counter['calls'])
+
+        factory = report['factory']
+        self.assertTrue(factory['hits'])
+        for entry in factory['types'].values():
+            self.assertEqual(sum(entry['histogram']), entry['hits'] + entry['misses'])
+
+        fromxml = report['types']['{urn:test}getTempResponse']['fromxml']
+        self.assertEqual(sum(fromxml['histogram']), 3)
+
+    def test_disable(self):
+        saved = dict(types.converters)
+        self.instrument.enable()
+        self.assertFalse(types.converters['xs:int'] is saved['xs:int'])
+        class my_int(types.xs_int):
+            pass
+        types.register('xs:int', my_int)
+        try:
+            self.instrument.disable()
+            self.assertTrue(types.converters['xs:int'] is my_int)
+            del saved['xs:int']
+            for (typestr, conv) in saved.items():
+                self.assertTrue(types.converters[typestr] is conv)
+        finally:
+            types.register('xs:int', types.xs_int)
+
+if __name__ == '__main__':
+    unittest.main()
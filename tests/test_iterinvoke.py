@@ -0,0 +1,30 @@
+import unittest
+from support import ClientTest, Transport, ENVELOPE
+from bubbles.soap.client import SoapFault
+
+READINGS = ENVELOPE % ('<t:getReadingsResponse>%s</t:getReadingsResponse>' %
+        ''.join('<t:reading><t:id>%d</t:id><t:b>%d</t:b></t:reading>' % (i, i * 2)
+                for i in range(50)))
+
+FAULT = ENVELOPE % '''<soapenv:Fault>
+<faultcode>soapenv:Server</faultcode>
+<faultstring>No such bay</faultstring>
+</soapenv:Fault>'''
+
+class IterInvokeTest(ClientTest):
+    def test_items(self):
+        c = self.client(transport=Transport(lambda data: READINGS))
+        ids = [r.id for r in c.TestService.getReadings.iter(1)]
+        self.assertEqual(ids, range(50))
+
+    def test_fault(self):
+        c = self.client(transport=Transport(lambda data: FAULT))
+        try:
+            list(c.TestService.getReadings.iter(1))
+            self.fail('no fault raised')
+        except SoapFault as f:
+            self.assertEqual(f.code[1], 'Server')
+            self.assertEqual(f.message, 'No such bay')
+
+if __name__ == '__main__':
+    unittest.main()
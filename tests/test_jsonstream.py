@@ -0,0 +1,58 @@
+import unittest
+import json
+from datetime import datetime
+from StringIO import StringIO
+from support import ClientTest
+from bubbles.dobject import DynamicObject
+from bubbles import jsonstream
+from bubbles.xmlimpl import ET
+
+READING = '''<t:reading xmlns:t="urn:test" ver="2"><t:id>1</t:id><t:value>2.5</t:value>
+<t:when>2012-01-02T03:04:05</t:when><t:tag>a</t:tag><t:tag>b</t:tag><t:b>7</t:b></t:reading>'''
+
+class JsonStreamTest(ClientTest):
+    def test_encode(self):
+        obj = DynamicObject([('a', 1), ('b', [True, None, u'x\xe9']),
+                ('c', DynamicObject(d=2.5)), ('e', {'f': []})])
+        text = jsonstream.dumps(obj)
+        self.assertEqual(json.loads(text),
+                {'a': 1, 'b': [True, None, u'x\xe9'], 'c': {'d': 2.5}, 'e': {'f': []}})
+        self.assertTrue(text.index('"a"') < text.index('"b"') < text.index('"c"'))
+
+    def test_dump(self):
+        obj = DynamicObject(items=[DynamicObject(id=i) for i in range(3000)])
+        fp = StringIO()
+        jsonstream.dump(obj, fp)
+        self.assertEqual(fp.getvalue(), jsonstream.dumps(obj))
+        self.assertEqual(len(json.loads(fp.getvalue())['items']), 3000)
+
+    def test_deep(self):
+        # Deeper than the recursion limit
+        obj = leaf = DynamicObject()
+        for i in range(5000):
+            leaf.child = DynamicObject()
+            leaf = leaf.child
+        leaf.value = 1
+        text = jsonstream.dumps(obj)
+        self.assertEqual(text.count('{'), 5001)
+
+    def test_scalars(self):
+        text = jsonstream.dumps([float('nan'), datetime(2012, 1, 2, 3, 4, 5)])
+        self.assertEqual(text, '[NaN, "2012-01-02T03:04:05"]')
+
+    def test_schema(self):
+        cls = self.wsdl().builder.factory('{urn:test}Reading')
+        obj = cls(ET.fromstring(READING))
+        text = jsonstream.dumps(obj, attrprefix='@', classname=True)
+        data = json.loads(text)
+        self.assertEqual(data['@ver'], 2)
+        self.assertEqual(data['__classname__'], obj.__class__.__name__)
+        copy = jsonstream.loads(text, cls=cls, attrprefix='@')
+        self.assertTrue(isinstance(copy, cls))
+        self.assertEqual(copy._ver, 2)
+        self.assertEqual(copy.when, obj.when)
+        self.assertEqual(copy.tag, ['a', 'b'])
+        self.assertEqual(jsonstream.dumps(copy), jsonstream.dumps(obj))
+
+if __name__ == '__main__':
+    unittest.main()
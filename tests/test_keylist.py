@@ -0,0 +1,23 @@
+import unittest
+from bubbles.util.keylist import KeyList
+
+class KeyListTest(unittest.TestCase):
+    def test_remove(self):
+        k = KeyList(['a', 'b', 'c'])
+        k.remove('b')
+        self.assertEqual(list(k), ['a', 'c'])
+        self.assertEqual(k[1], 'c')
+        self.assertFalse('b' in k)
+
+    def test_remove_while_iterating(self):
+        k = KeyList(['a', 'b', 'c', 'd'])
+        seen = []
+        for key in k:
+            seen.append(key)
+            if key == 'a':
+                k.remove('c')
+        self.assertEqual(seen, ['a', 'b', 'd'])
+        self.assertEqual(k[:], ['a', 'b', 'd'])
+
+if __name__ == '__main__':
+    unittest.main()
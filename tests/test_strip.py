@@ -0,0 +1,31 @@
+import unittest
+from support import ClientTest, Transport, ENVELOPE, TEMP
+from bubbles.xmlimpl import ET
+
+PONG = ENVELOPE % '<t:pingResponse><t:id>3</t:id></t:pingResponse>'
+
+def respond(data):
+    return PONG if 'ping' in data else TEMP
+
+class StripTest(ClientTest):
+    def test_invoke(self):
+        c = self.client(transport=Transport(respond))
+        ret = c.strip()
+        self.assertTrue(ret['elements'] > 0)
+        self.assertEqual(c.wsdl.documents, [])
+        self.assertFalse([s for s in self.loader.schemas.values() if s['root'] is not None])
+
+        # Messages whose element is declared with type= too
+        self.assertEqual(c.TestService.ping(id=1).id, 3)
+        sent = ET.fromstring(c.transport.sent[-1])
+        self.assertEqual(sent.findtext('.//{urn:test}id'), '1')
+        self.assertEqual(c.TestService.getTemp(1).value, 42)
+
+    def test_validators(self):
+        c = self.client(validate='raise')
+        c.strip()
+        self.assertEqual(c.TestService.getTemp(1).value, 42)
+        self.assertEqual(len(self.validated), 1)
+
+if __name__ == '__main__':
+    unittest.main()
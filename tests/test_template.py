@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime, date, time
+from support import ClientTest
+from bubbles.soap.client import Placeholder
+
+VALUES = {
+    'bay': '7',
+    'when': '2012-01-02T03:04:05',
+    'day': '2012-01-02',
+    'at': '03:04:05',
+    'sync': 'true',
+}
+
+class TemplateTest(ClientTest):
+    def make(self, wire):
+        c = self.client(wire=wire)
+        self.transport = c.transport
+        return c
+
+    def template(self, client):
+        placeholders = dict((k, Placeholder(k)) for k in VALUES)
+        return client.TestService.setClock.template(**placeholders)
+
+    def test_strings(self):
+        # Strings are converted like deserializing converts them
+        for wire in ('pretty', 'compact'):
+            c = self.make(wire)
+            c.TestService.setClock(bay=7, when=datetime(2012, 1, 2, 3, 4, 5),
+                    day=date(2012, 1, 2), at=time(3, 4, 5), sync=True)
+            self.assertEqual(self.template(c).render(**VALUES), self.transport.sent[-1])
+
+    def test_text(self):
+        c = self.make('compact')
+        tmpl = c.TestService.getReadings.template(5, filter=Placeholder('f'))
+        c.TestService.getReadings(5, filter=u'fé<')
+        self.assertEqual(tmpl.render(f=u'fé<'), self.transport.sent[-1])
+
+    def test_bad_value(self):
+        tmpl = self.template(self.make('pretty'))
+        values = dict(VALUES, when='yesterday')
+        self.assertRaises(ValueError, tmpl.render, **values)
+
+if __name__ == '__main__':
+    unittest.main()
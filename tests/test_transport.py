@@ -0,0 +1,96 @@
+import unittest
+import os
+import threading
+import urllib2
+import time
+import ssl
+from support import ClientTest, TEMP, DATA
+from bubbles.misc import benchtls
+from bubbles.soap.transport import Transport, ConnectionCache
+
+PEM = os.path.join(DATA, 'tls.pem')
+
+class Handler(benchtls.Handler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+        if 'slow' in self.path:
+            time.sleep(1.0)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(TEMP)))
+        self.end_headers()
+        self.wfile.write(TEMP)
+        # Close the connection without saying so, like a server whose
+        # keep-alive timeout has passed
+        self.close_connection = self.server.drop
+
+class TransportTest(ClientTest):
+    def setUp(self):
+        ClientTest.setUp(self)
+        self.server = benchtls.Server(PEM)
+        self.server.RequestHandlerClass = Handler
+        self.server.requests = 0
+        self.server.drop = False
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.context = ssl.create_default_context(cafile=PEM)
+        self.cache = ConnectionCache()
+        self.transport = Transport(self.cache, self.context)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.cache.clear()
+        ClientTest.tearDown(self)
+
+    def test_reuse(self):
+        for i in range(2):
+            c = self.client(url=self.server.url(), transport=self.transport)
+            self.assertEqual(c.TestService.getTemp(1).value, 42)
+            self.assertEqual(c.TestService.getTemp(2).value, 42)
+        self.assertEqual(self.server.handshakes, 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reused'], 3)
+        self.assertEqual(stats['reuse_rate'], 0.75)
+        hostport = 'localhost:%d' % self.server.server_address[1]
+        self.assertEqual(stats['hosts'][hostport]['reuse_rate'], 0.75)
+
+    def test_stale(self):
+        c = self.client(url=self.server.url(), transport=self.transport)
+        self.server.drop = True
+        self.assertEqual(c.TestService.getTemp(1).value, 42)
+        time.sleep(0.2)
+        self.assertEqual(c.TestService.getTemp(2).value, 42)
+        self.assertEqual(self.server.handshakes, 2)
+        self.assertEqual(self.server.requests, 2)
+        stats = self.cache.stats()
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['connections'], 2)
+        self.assertEqual(stats['reused'], 0)
+
+    def test_timeout(self):
+        c = self.client(url=self.server.url(), transport=self.transport)
+        self.assertEqual(c.TestService.getTemp(1).value, 42)
+        c = self.client(url=self.server.url() + '/slow', transport=self.transport)
+        self.assertRaises(urllib2.URLError, c.TestService.getTemp, 1, __timeout__=0.3)
+        time.sleep(1.0)
+        # The request may have been processed; it isn't sent again
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.cache.stats()['retries'], 0)
+
+    def test_context(self):
+        c = self.client(url=self.server.url(), transport=Transport(self.cache))
+        try:
+            c.TestService.getTemp(1)
+            self.fail('untrusted certificate accepted')
+        except urllib2.URLError as ex:
+            self.assertTrue(isinstance(ex.reason, ssl.SSLError))
+        ret = c.TestService.getTemp(1, __transport__={'context': self.context})
+        self.assertEqual(ret.value, 42)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import threading
+import tempfile
+import shutil
+import logging
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from bubbles.util.urlcache import URLCache, CacheMiss
+
+DOC = '<doc><a>1</a></doc>'
+
+# Using a cached copy is logged as a warning
+logging.getLogger('bubbles.util.urlcache').addHandler(logging.NullHandler())
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(DOC)))
+        self.send_header('ETag', '"v1"')
+        if server.maxage is not None:
+            self.send_header('Cache-Control', 'max-age=%d' % server.maxage)
+        self.end_headers()
+        self.wfile.write(DOC)
+
+    def log_message(self, *args):
+        pass
+
+class URLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = HTTPServer(('localhost', 0), Handler)
+        self.server.requests = []
+        self.server.maxage = None
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://localhost:%d/doc.xml' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.stop()
+        shutil.rmtree(self.dir)
+
+    def stop(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.thread = None
+
+    def test_parse(self):
+        cache = URLCache()
+        root = cache.parse(self.url)
+        self.assertEqual(root.findtext('a'), '1')
+        # Callers get their own copies
+        root.remove(root[0])
+        self.assertEqual(cache.parse(self.url).findtext('a'), '1')
+        self.assertEqual(len(self.server.requests), 1)
+        cache.clear()
+        cache.parse(self.url)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_maxage(self):
+        self.server.maxage = 3600
+        URLCache(self.dir).fetch(self.url)
+        # A new process would find it on disk, still fresh
+        self.assertEqual(URLCache(self.dir).fetch(self.url), DOC)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_revalidate(self):
+        URLCache(self.dir).fetch(self.url)
+        self.assertEqual(URLCache(self.dir).fetch(self.url), DOC)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1].get('if-none-match'), '"v1"')
+
+    def test_unreachable(self):
+        URLCache(self.dir).fetch(self.url)
+        self.stop()
+        self.assertEqual(URLCache(self.dir).fetch(self.url), DOC)
+
+    def test_offline(self):
+        offline = URLCache(self.dir, offline=True)
+        self.assertRaises(CacheMiss, offline.fetch, self.url)
+        URLCache(self.dir).fetch(self.url)
+        self.assertEqual(offline.fetch(self.url), DOC)
+        self.assertEqual(len(self.server.requests), 1)
+
+if __name__ == '__main__':
+    unittest.main()
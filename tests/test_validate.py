@@ -0,0 +1,44 @@
+import unittest
+from support import ClientTest, ENVELOPE
+from bubbles.xsd.schema import SchemaObject
+from bubbles.xmlimpl import ET
+
+READINGS = '''<t:getReadingsResponse xmlns:t="urn:test">
+<t:reading><t:id>1</t:id><t:b>7</t:b></t:reading>
+<t:reading><t:id>2</t:id><t:b>8</t:b></t:reading>
+</t:getReadingsResponse>'''
+
+class ValidateTest(ClientTest):
+    def setUp(self):
+        ClientTest.setUp(self)
+        self.cls = self.wsdl().builder.factory('{urn:test}getReadingsResponse')
+
+    def test_argument(self):
+        obj = self.cls(ET.fromstring(READINGS), __validate__='raise')
+        self.assertEqual(len(obj.reading), 2)
+        self.assertEqual(self.validated, ['{urn:test}getReadingsResponse'])
+
+    def test_class(self):
+        # The children inherit __validate__, but are covered by their parent
+        SchemaObject.__validate__ = 'raise'
+        obj = self.cls(ET.fromstring(READINGS))
+        self.assertEqual(len(obj.reading), 2)
+        self.assertEqual(self.validated, ['{urn:test}getReadingsResponse'])
+
+    def test_lazy(self):
+        # The children are built when they're read, after validation
+        SchemaObject.__validate__ = 'raise'
+        cls = self.wsdl(lazy=True).builder.factory('{urn:test}getReadingsResponse')
+        obj = cls(ET.fromstring(READINGS))
+        self.assertEqual([r.id for r in obj.reading], [1, 2])
+        self.assertEqual(self.validated, ['{urn:test}getReadingsResponse'])
+
+    def test_every(self):
+        c = self.client(validate='raise', validate_every=3)
+        c.transport.respond = lambda data: ENVELOPE % READINGS
+        for i in range(7):
+            self.assertEqual(len(c.TestService.getReadings(1)), 2)
+        self.assertEqual(len(self.validated), 3)
+
+if __name__ == '__main__':
+    unittest.main()